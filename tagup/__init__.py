@@ -6,8 +6,15 @@ See file LICENSE for full license details.
 
 from pkg_resources import get_distribution, DistributionNotFound
 
+from .arguments import LazyPositionalArguments
+from .evaluation import SafeString
+from .parallel import create_render_pool
 from .language import (
+    AutoescapeMixin,
     BaseRenderer,
+    CacheMixin,
+    FileSystemTagMixin,
+    ShadowMixin,
     StaticTagMixin,
     TagDictMixin,
     TrimMixin,
@@ -0,0 +1,12 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+import sys
+
+from .cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from lark import Tree
+
+
+class References:
+    def __init__(self):
+        self.named = set()
+        self.positional = set()
+        self.loop = False
+        self.tags = set()
+        self.calls = []
+
+
+class ArgumentUsage:
+    def __init__(self, references):
+        # Arguments read directly from the markup's own context.
+        self.named = set(references.named)
+        self.positional = set(references.positional)
+        self.loop = references.loop
+        # Globals read by nested tags, and every tag reachable from here.
+        self.globals = set()
+        self.tags = set()
+        self.missing_tags = set()
+        self.calls = references.calls
+
+    def propagate(self, usages):
+        changed = False
+        for name, passed_names in self.calls:
+            usage = usages[name]
+            if usage is None:
+                tags, missing_tags, global_names = {name}, {name}, set()
+            else:
+                tags = usage.tags | {name}
+                missing_tags = usage.missing_tags
+                global_names = (usage.named - passed_names) | usage.globals
+            if not (
+                tags <= self.tags
+                and missing_tags <= self.missing_tags
+                and global_names <= self.globals
+            ):
+                self.tags |= tags
+                self.missing_tags |= missing_tags
+                self.globals |= global_names
+                changed = True
+
+        return changed
+
+
+def _static_name(block):
+    # Only names made of literal text are known without rendering.
+    if any(isinstance(child, Tree) for child in block.children):
+        return None
+
+    return ''.join(block.children).strip()
+
+
+def find_references(ast):
+    references = References()
+    for subtree in ast.iter_subtrees():
+        data = subtree.data
+        if data in ('named_substitution', 'named_test'):
+            references.named.add(subtree.children[0].strip())
+        elif data in ('positional_substitution', 'positional_test'):
+            references.positional.add(int(subtree.children[0]) - 1)
+        elif data == 'positional_loop':
+            references.loop = True
+        elif data == 'tag':
+            name = str(subtree.children[0])
+            passed_names = frozenset(
+                _static_name(arg.children[0])
+                for arg in subtree.children[1:]
+                if arg.data == 'named_argument'
+            )
+            references.tags.add(name)
+            references.calls.append((name, passed_names))
+
+    return references
+
+
+def analyze_tags(renderer, tag_names):
+    usages = dict()
+    pending = list(tag_names)
+    while pending:
+        name = pending.pop()
+        if name in usages:
+            continue
+        try:
+            markup = renderer.get_tag(name)
+        except Exception:
+            usages[name] = None
+            continue
+        references = renderer.get_references(markup)
+        usages[name] = ArgumentUsage(references)
+        pending.extend(references.tags)
+
+    # Tags may call each other recursively, so propagate until nothing
+    # changes. Every set only grows, which guarantees termination.
+    changed = True
+    while changed:
+        changed = False
+        for usage in usages.values():
+            if usage is not None and usage.propagate(usages):
+                changed = True
+
+    return usages
+
+
+def analyze_markup(renderer, markup):
+    references = renderer.get_references(markup)
+    usage = ArgumentUsage(references)
+    usage.propagate(analyze_tags(renderer, references.tags))
+
+    return usage
@@ -0,0 +1,89 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from .exceptions import PositionalArgumentDiscarded
+
+
+class LazyPositionalArguments:
+    # Items are fetched on demand. The first buffer_size items are kept for
+    # random access and later ones are only kept while they are the most
+    # recently fetched, unless the arguments are retained, which keeps every
+    # item just like a list would.
+    def __init__(self, iterable, buffer_size=1024, tag_stack=None):
+        self._iterator = iter(iterable)
+        self._buffer = []
+        self._buffer_size = buffer_size
+        self._tag_stack = tag_stack
+        self._last = None
+        self._count = 0
+        self._exhausted = False
+        self._retained = False
+
+    def retain(self):
+        # Items already discarded cannot be brought back.
+        self._retained = self._count == len(self._buffer)
+
+    def __getitem__(self, index):
+        if index < 0:
+            raise IndexError(index)
+        while index >= self._count:
+            if self._exhausted:
+                raise IndexError(index)
+            try:
+                item = next(self._iterator)
+            except StopIteration:
+                self._exhausted = True
+                raise IndexError(index)
+            if len(self._buffer) == self._count and (
+                self._retained or self._count < self._buffer_size
+            ):
+                self._buffer.append(item)
+            self._last = item
+            self._count += 1
+
+        if index < len(self._buffer):
+            return self._buffer[index]
+        if index == self._count - 1:
+            return self._last
+
+        message = (
+            f'positional argument {index + 1} was discarded after streaming '
+            f'past the {self._buffer_size} item buffer'
+        )
+        trace = None
+        if self._tag_stack is not None:
+            trace = self._tag_stack.stack_trace(str(index + 1))
+            message = f'{message}: {trace}'
+        raise PositionalArgumentDiscarded(message, tag_stack_trace=trace)
+
+    def __iter__(self):
+        # Iterators only hold a position, so any number of them can run at
+        # once over a single pass through the underlying iterable.
+        index = 0
+        while True:
+            try:
+                item = self[index]
+            except IndexError:
+                return
+            yield item
+            index += 1
+
+
+class ArgumentScope:
+    __slots__ = ('_layer', '_parent')
+
+    def __init__(self, layer, parent):
+        self._layer = layer
+        self._parent = parent
+
+    def __getitem__(self, name):
+        try:
+            return self._layer[name]
+        except KeyError:
+            return self._parent[name]
+
+    def __contains__(self, name):
+        return name in self._layer or name in self._parent
@@ -0,0 +1,131 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from collections.abc import Sequence
+
+from lark import Token, Tree
+
+from .evaluation import SafeString
+
+
+# Nodes whose value depends on the arguments of an individual render.
+DYNAMIC_NODES = {
+    'named_substitution',
+    'positional_substitution',
+    'streamed_loop',
+    'loop_item',
+}
+
+CONTROL_FLOW_NODES = {
+    'named_test',
+    'positional_test',
+    'positional_loop',
+}
+
+
+def find_control_flow(ast):
+    return [
+        (node.data, node.children[0])
+        for node in ast.iter_subtrees()
+        if node.data in CONTROL_FLOW_NODES
+    ]
+
+
+def get_branches(control_flow, combined_named_args, pos_args):
+    branches = []
+    for data, arg in control_flow:
+        if data == 'named_test':
+            branches.append(arg in combined_named_args)
+        else:
+            index = int(arg) - 1 if data == 'positional_test' else 0
+            try:
+                pos_args[index]
+            except IndexError:
+                branches.append(False)
+            else:
+                branches.append(True)
+
+    return tuple(branches)
+
+
+def fold(c_eval, node):
+    # Evaluate every subtree that does not depend on per-render arguments,
+    # leaving a residual tree that only needs substitutions filled in.
+    dynamic = node.data in DYNAMIC_NODES
+    children = []
+    for child in node.children:
+        if isinstance(child, Tree):
+            child, child_dynamic = fold(c_eval, child)
+            dynamic = dynamic or child_dynamic
+            if isinstance(child, str):
+                # Folded text is literal text to the residual tree, so it
+                # is still charged against output budgets.
+                child = Token('STRING', child)
+                if node.data == 'streamed_loop':
+                    # Loop bodies are traversed once per item, so a
+                    # constant body is kept as a block of its folded text.
+                    child = Tree('block', [child])
+        children.append(child)
+    node = Tree(node.data, children)
+    if dynamic:
+        return node, True
+
+    return c_eval.process(node), False
+
+
+def render_batch(renderer, markup, arg_sets):
+    ast = renderer.parse_markup(markup)
+    control_flow = find_control_flow(ast)
+    _, c_eval, _ = renderer.get_evaluators()
+
+    residuals = dict()
+    results = []
+    for named_args, pos_args in arg_sets:
+        if not isinstance(pos_args, Sequence):
+            pos_args = renderer.stream_pos_args(ast, pos_args)
+        combined_named_args = renderer.combine_named_args(named_args)
+        branches = get_branches(control_flow, combined_named_args, pos_args)
+
+        renderer.begin_render()
+        try:
+            try:
+                residual = residuals[branches]
+            except KeyError:
+                intermediate = renderer.evaluate_control_flow(
+                    ast,
+                    combined_named_args,
+                    pos_args
+                )
+                context = c_eval.bind(combined_named_args, pos_args)
+                if renderer.budget is not None:
+                    output = renderer.budget.output
+                try:
+                    residual, _ = fold(c_eval, intermediate)
+                finally:
+                    c_eval.bind(*context)
+                # Folded output is charged when the residual is rendered.
+                if renderer.budget is not None:
+                    renderer.budget.output = output
+                residuals[branches] = residual
+
+            if isinstance(residual, Tree):
+                result = renderer.evaluate_common(
+                    residual,
+                    combined_named_args,
+                    pos_args
+                )
+            else:
+                if renderer.budget is not None:
+                    renderer.budget.charge_output(len(residual))
+                if renderer.autoescape:
+                    result = SafeString(residual)
+                else:
+                    result = residual
+            results.append(result)
+        finally:
+            renderer.end_render()
+
+    return results
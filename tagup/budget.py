@@ -0,0 +1,66 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from math import inf
+from time import monotonic
+
+from .exceptions import RenderLimitExceeded
+
+
+class RenderBudget:
+    def __init__(
+        self,
+        tag_stack,
+        max_nodes=None,
+        max_output_size=None,
+        max_tag_calls=None,
+        timeout=None,
+    ):
+        self.tag_stack = tag_stack
+        self.max_nodes = inf if max_nodes is None else max_nodes
+        self.max_output_size = (
+            inf if max_output_size is None else max_output_size
+        )
+        self.max_tag_calls = inf if max_tag_calls is None else max_tag_calls
+        self.timeout = timeout
+        self.start()
+
+    def start(self):
+        self.nodes = 0
+        self.tag_calls = 0
+        self.output = 0
+        self.deadline = inf if self.timeout is None else (
+            monotonic() + self.timeout
+        )
+
+    def exceeded(self, limit):
+        trace = self.tag_stack.stack_trace()
+        raise RenderLimitExceeded(
+            f'{limit} exceeded: {trace}',
+            tag_stack_trace=trace,
+            limit=limit
+        )
+
+    def check_deadline(self):
+        if self.deadline is not inf and monotonic() > self.deadline:
+            self.exceeded('timeout')
+
+    def charge_nodes(self, count):
+        self.nodes += count
+        if self.nodes > self.max_nodes:
+            self.exceeded('max_nodes')
+        self.check_deadline()
+
+    def charge_tag_call(self):
+        self.tag_calls += 1
+        if self.tag_calls > self.max_tag_calls:
+            self.exceeded('max_tag_calls')
+        self.check_deadline()
+
+    def charge_output(self, size):
+        self.output += size
+        if self.output > self.max_output_size:
+            self.exceeded('max_output_size')
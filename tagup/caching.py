@@ -0,0 +1,148 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from threading import Lock
+from time import monotonic
+from weakref import WeakValueDictionary
+
+
+class LRUCacheStore:
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        value, expires = self._entries[key]
+        if expires is not None and monotonic() >= expires:
+            del self._entries[key]
+            raise KeyError(key)
+        self._entries.move_to_end(key)
+
+        return value
+
+    def set(self, key, value, ttl=None):
+        expires = None if ttl is None else monotonic() + ttl
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class LRUDict(MutableMapping):
+    # A mapping that only keeps its most recently used entries. Pinned
+    # entries are never evicted, and reading them never writes to the
+    # mapping, so they stay on pages shared with forked processes.
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._pinned = dict()
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._pinned) + len(self._entries)
+
+    def __iter__(self):
+        # Lookups reorder entries, so iteration works on a snapshot.
+        return iter(list(self._pinned) + list(self._entries))
+
+    def __contains__(self, key):
+        return key in self._pinned or key in self._entries
+
+    def __getitem__(self, key):
+        try:
+            return self._pinned[key]
+        except KeyError:
+            pass
+        with self._lock:
+            value = self._entries[key]
+            self._entries.move_to_end(key)
+
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._pinned:
+            self._pinned[key] = value
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __delitem__(self, key):
+        try:
+            del self._pinned[key]
+        except KeyError:
+            with self._lock:
+                del self._entries[key]
+
+    def pin(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._pinned[key] = value
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.max_size,),
+            (dict(self._pinned), list(self._entries.items())),
+        )
+
+    def __setstate__(self, state):
+        pinned, entries = state
+        for key, value in pinned.items():
+            self.pin(key, value)
+        self.update(entries)
+
+
+class ParseStore:
+    # Parsed trees stay shared for as long as any renderer still holds them,
+    # and the most recently used ones are also kept alive by the store.
+    def __init__(self, max_size=256):
+        self._entries = WeakValueDictionary()
+        self._recent = LRUCacheStore(max_size)
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries[key]
+            self._recent.set(key, value)
+
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            value = self._entries.setdefault(key, value)
+            self._recent.set(key, value)
+
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._recent.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._recent.clear()
+
+
+shared_parse_store = ParseStore()
@@ -0,0 +1,447 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+import json
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+
+from .exceptions import TagupError
+from .language import BaseRenderer, TagDictMixin
+from .recording import read_recording, replay
+
+
+class LibraryRenderer(TagDictMixin, BaseRenderer):
+    pass
+
+
+class RenderResult:
+    def __init__(self, source, input_size, output_size, duration, error=None):
+        self.source = source
+        self.input_size = input_size
+        self.output_size = output_size
+        self.duration = duration
+        self.error = error
+
+
+class RenderStats:
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def failures(self):
+        return [r for r in self.results if r.error is not None]
+
+    def __str__(self):
+        count = len(self.results)
+        elapsed = self.elapsed or float('inf')
+        input_size = sum(r.input_size for r in self.results)
+        output_size = sum(r.output_size for r in self.results)
+        durations = [r.duration for r in self.results] or [0.0]
+        lines = [
+            f'rendered {count} files ({len(self.failures)} failed) '
+            f'in {self.elapsed:.3f}s',
+            f'  throughput: {count / elapsed:.1f} files/s, '
+            f'{input_size / elapsed / 1e6:.2f} MB/s in, '
+            f'{output_size / elapsed / 1e6:.2f} MB/s out',
+            f'  per file: mean {1e3 * sum(durations) / len(durations):.2f}ms, '
+            f'max {1e3 * max(durations):.2f}ms',
+        ]
+        lines.extend(
+            f'  {r.source}: {r.error}'
+            for r in self.failures
+        )
+
+        return '\n'.join(lines)
+
+
+_worker_renderer = None
+
+
+def _init_worker(tags, global_named_args, max_depth):
+    global _worker_renderer
+    _worker_renderer = LibraryRenderer(tags, max_depth=max_depth)
+    _worker_renderer.set_globals(global_named_args)
+    _worker_renderer.warm(freeze=False)
+
+
+def _render_file(source, destination):
+    start = time.perf_counter()
+    # Sources may be removed or still being written while a run is under
+    # way, which fails the file rather than the run.
+    try:
+        with open(source, encoding='utf-8') as f_in:
+            markup = f_in.read()
+    except (OSError, ValueError) as err:
+        return RenderResult(
+            source,
+            0,
+            0,
+            time.perf_counter() - start,
+            f'{err.__class__.__name__}: {err}'
+        )
+    try:
+        result = _worker_renderer.render_markup(markup)
+    except TagupError as err:
+        return RenderResult(
+            source,
+            len(markup),
+            0,
+            time.perf_counter() - start,
+            f'{err.__class__.__name__}: {err}'
+        )
+
+    os.makedirs(path.dirname(destination), exist_ok=True)
+    with open(destination, 'w', encoding='utf-8') as f_out:
+        f_out.write(result)
+
+    return RenderResult(
+        source,
+        len(markup),
+        len(result),
+        time.perf_counter() - start
+    )
+
+
+class BatchRenderer:
+    def __init__(
+        self,
+        source_dir,
+        dest_dir,
+        library_path,
+        globals_path=None,
+        jobs=1,
+        suffix='.tagup',
+        output_suffix='.html',
+        max_depth=8,
+    ):
+        self.source_dir = source_dir
+        self.dest_dir = dest_dir
+        self.library_path = library_path
+        self.globals_path = globals_path
+        self.jobs = jobs
+        self.suffix = suffix
+        self.output_suffix = output_suffix
+        self.max_depth = max_depth
+        self.sources = dict()
+        self.tag_deps = dict()
+        self.source_deps = dict()
+        self.load_library()
+
+    def load_library(self):
+        with open(self.library_path, encoding='utf-8') as f_in:
+            tags = json.load(f_in)
+        if self.globals_path is not None:
+            with open(self.globals_path, encoding='utf-8') as f_in:
+                global_named_args = json.load(f_in)
+        else:
+            global_named_args = dict()
+
+        old_tags = getattr(self, 'tags', dict())
+        changed = {
+            name
+            for name in old_tags.keys() | tags.keys()
+            if old_tags.get(name) != tags.get(name)
+        }
+        self.tags = tags
+        self.global_named_args = global_named_args
+        self.library_mtime = self.get_library_mtime()
+        self.renderer = LibraryRenderer(tags, max_depth=self.max_depth)
+        self.tag_deps = {
+            name: deps
+            for name, deps in self.tag_deps.items()
+            if name not in changed
+        }
+
+        return changed
+
+    def get_library_mtime(self):
+        paths = [self.library_path]
+        if self.globals_path is not None:
+            paths.append(self.globals_path)
+
+        return tuple(os.stat(p).st_mtime_ns for p in paths)
+
+    def find_sources(self):
+        sources = dict()
+        for dirpath, _, filenames in os.walk(self.source_dir):
+            for filename in filenames:
+                if filename.endswith(self.suffix):
+                    source = path.join(dirpath, filename)
+                    try:
+                        sources[source] = os.stat(source).st_mtime_ns
+                    except FileNotFoundError:
+                        continue
+
+        return sources
+
+    def get_destination(self, source):
+        relpath = path.relpath(source, self.source_dir)
+
+        return path.join(
+            self.dest_dir,
+            relpath[:-len(self.suffix)] + self.output_suffix
+        )
+
+    def discover_markup_tags(self, markup):
+        try:
+            return self.renderer.discover_tags(
+                self.renderer.parse_markup(markup)
+            )
+        except TagupError:
+            return set()
+
+    def get_dependencies(self, source):
+        mtime = self.sources.get(source)
+        try:
+            cached_mtime, direct = self.source_deps[source]
+        except KeyError:
+            cached_mtime = direct = None
+        if direct is None or cached_mtime != mtime:
+            try:
+                with open(source, encoding='utf-8') as f_in:
+                    direct = self.discover_markup_tags(f_in.read())
+            except (OSError, ValueError):
+                # The render reports the source; it has no known
+                # dependencies until it can be read.
+                return set()
+            self.source_deps[source] = (mtime, direct)
+
+        result = set()
+        pending = list(direct)
+        while pending:
+            name = pending.pop()
+            if name in result:
+                continue
+            result.add(name)
+            try:
+                deps = self.tag_deps[name]
+            except KeyError:
+                deps = self.tag_deps[name] = self.discover_markup_tags(
+                    self.tags.get(name, '')
+                )
+            pending.extend(deps)
+
+        return result
+
+    def render(self, sources):
+        sources = sorted(sources)
+        jobs = [(s, self.get_destination(s)) for s in sources]
+        initargs = (self.tags, self.global_named_args, self.max_depth)
+        start = time.perf_counter()
+        if self.jobs > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(
+                max_workers=self.jobs,
+                initializer=_init_worker,
+                initargs=initargs,
+            ) as executor:
+                results = list(executor.map(
+                    _render_file,
+                    *zip(*jobs),
+                    chunksize=max(1, len(jobs) // (4 * self.jobs))
+                ))
+        else:
+            _init_worker(*initargs)
+            results = [_render_file(*job) for job in jobs]
+
+        return RenderStats(results, time.perf_counter() - start)
+
+    def render_all(self):
+        self.sources = self.find_sources()
+
+        return self.render(self.sources)
+
+    def poll(self):
+        changed_tags = set()
+        if self.get_library_mtime() != self.library_mtime:
+            changed_tags = self.load_library()
+
+        sources = self.find_sources()
+        stale = {
+            source
+            for source, mtime in sources.items()
+            if self.sources.get(source) != mtime
+        }
+        for source in self.sources.keys() - sources.keys():
+            self.source_deps.pop(source, None)
+            try:
+                os.remove(self.get_destination(source))
+            except FileNotFoundError:
+                pass
+        self.sources = sources
+
+        if changed_tags:
+            stale.update(
+                source
+                for source in sources
+                if not changed_tags.isdisjoint(self.get_dependencies(source))
+            )
+
+        return stale
+
+    def watch(self, interval=1.0, stream=sys.stderr, max_cycles=None):
+        print(self.render_all(), file=stream)
+        cycles = 0
+        while max_cycles is None or cycles < max_cycles:
+            time.sleep(interval)
+            cycles += 1
+            # A library that cannot be loaded, for example while it is being
+            # saved, is reported and the previous one is kept. Nothing is
+            # marked as seen, so the next poll picks every change up again.
+            try:
+                stale = self.poll()
+            except (OSError, ValueError) as err:
+                print(
+                    f'failed to load tag library: '
+                    f'{err.__class__.__name__}: {err}',
+                    file=stream
+                )
+                continue
+            if stale:
+                print(self.render(stale), file=stream)
+
+
+def get_argument_parser():
+    parser = ArgumentParser(
+        prog='python -m tagup',
+        description='Render Tagup markup files against a tag library.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for command, help_text in (
+        ('render', 'render every markup file under SOURCE into DEST'),
+        ('watch', 'render, then re-render files as they change'),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument('source', metavar='SOURCE')
+        subparser.add_argument('dest', metavar='DEST')
+        subparser.add_argument(
+            '-t', '--tags',
+            required=True,
+            metavar='FILE',
+            help='JSON object mapping tag names to tag markup'
+        )
+        subparser.add_argument(
+            '-g', '--globals',
+            metavar='FILE',
+            help='JSON object of global named arguments'
+        )
+        subparser.add_argument(
+            '-j', '--jobs',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='number of worker processes'
+        )
+        subparser.add_argument('--suffix', default='.tagup')
+        subparser.add_argument('--output-suffix', default='.html')
+        subparser.add_argument('--max-depth', type=int, default=8)
+        if command == 'watch':
+            subparser.add_argument(
+                '-i', '--interval',
+                type=float,
+                default=1.0,
+                help='seconds between checks for changed files'
+            )
+
+    subparser = subparsers.add_parser(
+        'validate',
+        help='check a tag library for syntax errors, missing tags and cycles'
+    )
+    subparser.add_argument(
+        '-t', '--tags',
+        required=True,
+        metavar='FILE',
+        help='JSON object mapping tag names to tag markup'
+    )
+    subparser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='number of worker processes'
+    )
+
+    subparser = subparsers.add_parser(
+        'replay',
+        help='re-render a recording and report timings and differences'
+    )
+    subparser.add_argument('recording', metavar='RECORDING')
+    subparser.add_argument(
+        '-t', '--tags',
+        required=True,
+        metavar='FILE',
+        help='JSON object mapping tag names to tag markup'
+    )
+    subparser.add_argument(
+        '-r', '--repeat',
+        type=int,
+        default=1,
+        help='number of times each recorded render is repeated'
+    )
+    subparser.add_argument('--max-depth', type=int, default=8)
+
+    return parser
+
+
+def replay_recording(recording_path, library_path, repeat, max_depth):
+    with open(library_path, encoding='utf-8') as f_in:
+        tags = json.load(f_in)
+    renderer = LibraryRenderer(tags, max_depth=max_depth)
+    renderer.warm(freeze=False)
+    records, skipped = read_recording(recording_path)
+    report = replay(renderer, records, skipped, repeat)
+    print(report, file=sys.stderr)
+
+    return 1 if report.differences else 0
+
+
+def validate(library_path, jobs):
+    with open(library_path, encoding='utf-8') as f_in:
+        tags = json.load(f_in)
+    report = LibraryRenderer(tags).validate_tags(jobs=jobs)
+    json.dump(report.as_dict(), sys.stdout, indent=2)
+    print()
+
+    return 0 if report.ok else 1
+
+
+def main(argv=None):
+    args = get_argument_parser().parse_args(argv)
+    if args.command == 'validate':
+        return validate(args.tags, args.jobs)
+    if args.command == 'replay':
+        return replay_recording(
+            args.recording,
+            args.tags,
+            args.repeat,
+            args.max_depth
+        )
+
+    batch = BatchRenderer(
+        args.source,
+        args.dest,
+        args.tags,
+        globals_path=args.globals,
+        jobs=args.jobs,
+        suffix=args.suffix,
+        output_suffix=args.output_suffix,
+        max_depth=args.max_depth,
+    )
+
+    if args.command == 'watch':
+        try:
+            batch.watch(args.interval)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    stats = batch.render_all()
+    print(stats, file=sys.stderr)
+
+    return 1 if stats.failures else 0
@@ -4,8 +4,6 @@ See file LICENSE for full license details.
 """
 
 
-from copy import deepcopy
-
 from lark import Token, Tree
 
 from .exceptions import (
@@ -19,12 +17,31 @@ from .traversal import (
 )
 
 
+class SafeString(str):
+    pass
+
+
 class ContextMixin:
-    def __init__(self, named_args, pos_args, *args, **kwargs):
+    def __init__(self, named_args=None, pos_args=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.named_args = named_args
         self.pos_args = pos_args
 
+    def bind(self, named_args, pos_args):
+        context = (self.named_args, self.pos_args)
+        self.named_args = named_args
+        self.pos_args = pos_args
+
+        return context
+
+    def has_pos_arg(self, index):
+        try:
+            self.pos_args[index]
+        except IndexError:
+            return False
+
+        return True
+
 
 class CommonEvaluator(ContextMixin, PostOrderTraverser):
     escape_sequences = {
@@ -36,41 +53,143 @@ class CommonEvaluator(ContextMixin, PostOrderTraverser):
     def __init__(self, renderer, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.renderer = renderer
+        self.item = None
+        # Tag arguments never reach the output themselves, so nothing
+        # evaluated inside them is charged against the output budget.
+        self.argument_depth = 0
+
+    def bind(self, named_args, pos_args, item=None):
+        context = super().bind(named_args, pos_args) + (self.item,)
+        self.item = item
+
+        return context
+
+    def traverse(self, node):
+        if node.data == 'streamed_loop':
+            return self.streamed_loop(node)
+        if node.data in ('named_argument', 'positional_argument'):
+            self.argument_depth += 1
+            try:
+                return super().traverse(node)
+            finally:
+                self.argument_depth -= 1
+
+        return super().traverse(node)
+
+    def process(self, node):
+        if node.data != 'block' or self.renderer.budget is None:
+            return super().process(node)
+
+        # Every evaluated child of a block was charged where it was
+        # produced, so the block charges its literal text only once it has
+        # been postprocessed.
+        charged = sum(
+            len(child)
+            for child in node.children
+            if not isinstance(child, Token)
+        )
+        result = super().process(node)
+        self.charge_output(len(result) - charged)
+
+        return result
+
+    def streamed_loop(self, node):
+        statement = node.children[0]
+        budget = self.renderer.budget
+        autoescape = self.renderer.autoescape
+        # Items of a nested loop body belong to the outermost loop.
+        nested = self.item is not None
+        result = []
+        try:
+            for arg in self.pos_args:
+                if budget is not None:
+                    budget.charge_nodes(1)
+                if not nested:
+                    if autoescape:
+                        arg = self.renderer.escape_value(arg)
+                    self.item = arg
+                result.append(self.traverse(statement))
+        finally:
+            if not nested:
+                self.item = None
+
+        return ''.join(result)
+
+    def loop_item(self, node):
+        if self.item is None:
+            return node
+
+        # The item is rendered as if it were a block of literal text.
+        return self.process(Tree('block', [Token('STRING', self.item)]))
+
+    def charge_output(self, size):
+        budget = self.renderer.budget
+        if budget is not None and not self.argument_depth:
+            budget.charge_output(size)
+
+    def charge_value(self, value):
+        self.charge_output(len(value))
+
+        return value
 
     def escape_sequence(self, node):
         sequence = node.children[0]
 
-        return self.escape_sequences[sequence]
+        return self.charge_value(self.escape_sequences[sequence])
 
     def named_substitution(self, node):
-        name = node.children[0].strip()
+        token = node.children[0]
+        name = token.strip()
         try:
             value = self.named_args[name]
         except KeyError:
+            if self.renderer.missing_argument_policy != 'raise':
+                return self.charge_value(self.renderer.render_missing(
+                    'named argument',
+                    name,
+                    token.line,
+                    token.column
+                ))
             trace = self.renderer.tag_stack.stack_trace(name)
             raise NamedArgumentMissing(
                 str(trace),
                 tag_stack_trace=trace
             )
+        if callable(value):
+            value = self.renderer.provide_value(value)
+        if self.renderer.autoescape:
+            value = self.renderer.escape_value(value)
 
-        return value
+        return self.charge_value(value)
 
     def positional_substitution(self, node):
-        position = node.children[0].strip()
+        token = node.children[0]
+        position = token.strip()
         arg_num = int(position) - 1
         try:
             value = self.pos_args[arg_num]
         except IndexError:
+            if self.renderer.missing_argument_policy != 'raise':
+                return self.charge_value(self.renderer.render_missing(
+                    'positional argument',
+                    position,
+                    token.line,
+                    token.column
+                ))
             trace = self.renderer.tag_stack.stack_trace(position)
             raise PositionalArgumentMissing(
                 str(trace),
                 tag_stack_trace=trace
             )
+        if self.renderer.autoescape:
+            value = self.renderer.escape_value(value)
 
-        return value
+        return self.charge_value(value)
 
     def block(self, node):
         children = node.children
+        if (budget := self.renderer.budget) is not None:
+            budget.charge_nodes(len(children))
 
         return ''.join(children)
 
@@ -90,12 +209,16 @@ class CommonEvaluator(ContextMixin, PostOrderTraverser):
         name = children[0]
         named_args = dict()
         pos_args = list()
+        autoescape = self.renderer.autoescape
         for arg in children[1:]:
+            value = SafeString(arg[-1]) if autoescape else arg[-1]
             if len(arg) == 2:
-                named_args[arg[0]] = arg[1]
+                named_args[arg[0]] = value
             else:
-                pos_args.append(arg[0])
+                pos_args.append(value)
 
+        if (budget := self.renderer.budget) is not None:
+            output = budget.output
         result = self.renderer.render_tag(
             name=name,
             named_args=named_args,
@@ -103,6 +226,10 @@ class CommonEvaluator(ContextMixin, PostOrderTraverser):
             line=name.line,
             column=name.column
         )
+        # Whatever the render charged is settled against the result, so a
+        # memoized or cached result is charged as a whole.
+        if budget is not None:
+            self.charge_output(output + len(result) - budget.output)
 
         return result
 
@@ -125,7 +252,7 @@ class ControlFlowEvaluator(ContextMixin, PreOrderTraverser):
         children = node.children
         arg_num = int(children[0]) - 1
         else_clause = len(children) == 3
-        if len(self.pos_args) > arg_num:
+        if self.has_pos_arg(arg_num):
             result = children[1].children[0]
         elif else_clause:
             result = children[2].children[0]
@@ -137,18 +264,12 @@ class ControlFlowEvaluator(ContextMixin, PreOrderTraverser):
     def positional_loop(self, node):
         children = node.children
         else_clause = len(children) == 2
-        if len(self.pos_args) > 0:
-            statement = children[0].children[0]
-            result = Tree(data='block', children=list())
-            for arg in self.pos_args:
-                new_statement = deepcopy(statement)
-                sub_args = new_statement.find_data('loop_item')
-                for sub_arg in sub_args:
-                    sub_arg.data = 'block'
-                    sub_arg.children = [
-                        Token('STRING', arg),
-                    ]
-                result.children.append(new_statement)
+        if self.has_pos_arg(0):
+            # The loop body is expanded one item at a time by the
+            # CommonEvaluator so the expanded tree is never materialized.
+            result = Tree(data='streamed_loop', children=[
+                children[0].children[0],
+            ])
         elif else_clause:
             result = children[1].children[0]
         else:
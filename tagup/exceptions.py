@@ -44,6 +44,16 @@ class PositionalArgumentMissing(ArgumentMissing):
     pass
 
 
+class PositionalArgumentDiscarded(ArgumentMissing):
+    pass
+
+
+class RenderLimitExceeded(TagupRenderingError):
+    def __init__(self, message, tag_stack_trace=None, limit=None):
+        super().__init__(message, tag_stack_trace)
+        self.limit = limit
+
+
 # Stack.
 
 class TagStackError(TagupError):
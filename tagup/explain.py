@@ -0,0 +1,281 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from lark import Tree
+
+from .exceptions import TagupRenderingError, TagupSyntaxError
+
+
+class PlanNode:
+    def __init__(self, name, depth, line=None, column=None, calls=1):
+        self.name = name
+        self.depth = depth
+        self.line = line
+        self.column = column
+        # How many times one run of the parent invokes this node.
+        self.calls = calls
+        self.parse = None
+        self.cache = None
+        self.missing = False
+        self.overflow = False
+        self.error = None
+        self.nodes = 0
+        self.loop_expansions = 0
+        self.children = []
+
+    @property
+    def total_nodes(self):
+        return self.nodes + sum(
+            child.calls * child.total_nodes
+            for child in self.children
+        )
+
+    @property
+    def total_loop_expansions(self):
+        return self.loop_expansions + sum(
+            child.calls * child.total_loop_expansions
+            for child in self.children
+        )
+
+    @property
+    def total_tag_calls(self):
+        return sum(
+            child.calls * (1 + child.total_tag_calls)
+            for child in self.children
+        )
+
+    @property
+    def max_depth(self):
+        return max(
+            (child.max_depth for child in self.children),
+            default=self.depth
+        )
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'line': self.line,
+            'column': self.column,
+            'depth': self.depth,
+            'calls': self.calls,
+            'parse': self.parse,
+            'cache': self.cache,
+            'missing': self.missing,
+            'overflow': self.overflow,
+            'error': self.error,
+            'nodes': self.nodes,
+            'loop_expansions': self.loop_expansions,
+            'children': [child.as_dict() for child in self.children],
+        }
+
+    def describe(self):
+        if self.line is None:
+            label = self.name
+        else:
+            label = f'{self.name}:{self.line},{self.column}'
+        if self.calls != 1:
+            label += f' x{self.calls}'
+        if self.missing:
+            return f'{label} (missing)'
+        if self.overflow:
+            return f'{label} (stack overflow)'
+        if self.error is not None:
+            return f'{label} (error: {self.error})'
+        details = [f'parse: {self.parse}']
+        if self.cache is not None:
+            details.append(f'cache: {self.cache}')
+        details.append(f'nodes: {self.nodes}')
+        if self.loop_expansions:
+            details.append(f'loop expansions: {self.loop_expansions}')
+
+        return f'{label} ({", ".join(details)})'
+
+    def lines(self, indent=''):
+        yield indent + self.describe()
+        for child in self.children:
+            yield from child.lines(indent + '  ')
+
+    def __str__(self):
+        lines = list(self.lines())
+        lines.append(
+            f'total: {self.total_tag_calls} tag calls, '
+            f'{self.total_nodes} nodes, '
+            f'{self.total_loop_expansions} loop expansions, '
+            f'depth {self.max_depth}'
+        )
+
+        return '\n'.join(lines)
+
+
+def _static_value(block):
+    if any(isinstance(child, Tree) for child in block.children):
+        return None
+
+    return ''.join(block.children)
+
+
+def _get_parse_status(renderer, markup, is_tag):
+    if not is_tag:
+        return 'parse'
+    if markup in renderer.tag_asts:
+        return 'memory'
+    try:
+        renderer.parse_store.get(renderer.get_parse_store_key(markup))
+    except KeyError:
+        return 'parse'
+
+    return 'shared'
+
+
+class Explainer:
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.cf_eval, _, _ = renderer.get_evaluators()
+        self.max_depth = renderer.tag_stack.max_depth
+
+    def explain(self, plan, markup, named_args, pos_args, is_tag):
+        renderer = self.renderer
+        plan.parse = _get_parse_status(renderer, markup, is_tag)
+        try:
+            if plan.parse == 'memory':
+                ast = renderer.tag_asts[markup]
+            elif is_tag:
+                ast = renderer.parse_shared_markup(markup)
+            else:
+                ast = renderer.parse_markup(markup)
+        except TagupSyntaxError as err:
+            plan.error = str(err)
+            return plan
+
+        # Control flow only depends on which arguments exist, so it is
+        # resolved exactly even though no argument value is rendered.
+        context = self.cf_eval.bind(
+            renderer.combine_named_args(named_args),
+            pos_args
+        )
+        try:
+            intermediate = self.cf_eval.traverse(ast)
+        finally:
+            self.cf_eval.bind(*context)
+        self.walk(plan, intermediate, 1, len(pos_args))
+
+        return plan
+
+    def walk(self, plan, node, multiplier, loop_items):
+        plan.nodes += multiplier
+        if not isinstance(node, Tree):
+            return
+        if node.data == 'streamed_loop':
+            plan.loop_expansions += multiplier * loop_items
+            multiplier *= loop_items
+        elif node.data == 'tag':
+            plan.children.append(self.explain_tag(plan, node, multiplier))
+        for child in node.children:
+            self.walk(plan, child, multiplier, loop_items)
+
+    def explain_tag(self, parent, node, multiplier):
+        renderer = self.renderer
+        children = node.children
+        name = children[0]
+        plan = PlanNode(
+            str(name),
+            parent.depth + 1,
+            name.line,
+            name.column,
+            multiplier
+        )
+        if plan.depth > self.max_depth:
+            plan.overflow = True
+            return plan
+        if not renderer.has_tag(name):
+            plan.missing = True
+            return plan
+
+        # Argument values stay unrendered; only their presence matters.
+        named_args = dict()
+        pos_args = []
+        static = True
+        for arg in children[1:]:
+            blocks = arg.children
+            values = [_static_value(block) for block in blocks]
+            if None in values:
+                static = False
+            if arg.data == 'named_argument':
+                if values[0] is not None:
+                    named_args[values[0].strip()] = values[1] or ''
+            else:
+                pos_args.append(values[0] or '')
+
+        get_cache_policy = getattr(renderer, 'get_cache_policy', None)
+        if get_cache_policy is not None:
+            try:
+                plan.cache = self.get_cache_status(
+                    name,
+                    named_args,
+                    pos_args,
+                    static
+                )
+            except TagupRenderingError as err:
+                plan.error = str(err)
+                return plan
+
+        return self.explain(
+            plan,
+            renderer.get_tag(name),
+            named_args,
+            pos_args,
+            True
+        )
+
+    def get_cache_status(self, name, named_args, pos_args, static):
+        renderer = self.renderer
+        policy = renderer.get_cache_policy(name, named_args)
+        if policy is None:
+            return None
+        key = policy[0]
+        if key is None:
+            if not static:
+                return 'unknown'
+            tag_versions, global_named_args = (
+                renderer.get_cache_dependencies(name)
+            )
+            # Providers are never called without rendering.
+            if any(callable(value) for value in global_named_args.values()):
+                return 'unknown'
+            named_args = {
+                arg: value
+                for arg, value in named_args.items()
+                if arg not in (renderer.cache_key_arg, renderer.cache_ttl_arg)
+            }
+            cache_key = (
+                name,
+                frozenset(named_args.items()),
+                tuple(pos_args),
+                tag_versions,
+                frozenset(global_named_args.items()),
+            )
+        elif static:
+            cache_key = (name, str(key))
+        else:
+            return 'unknown'
+        try:
+            renderer.cache_store.get(cache_key)
+        except KeyError:
+            return 'miss'
+
+        return 'hit'
+
+
+def explain(renderer, markup, named_args, pos_args):
+    plan = PlanNode('ROOT', 0)
+
+    return Explainer(renderer).explain(
+        plan,
+        markup,
+        named_args,
+        list(pos_args),
+        False
+    )
@@ -0,0 +1,81 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from hashlib import blake2b
+
+from .evaluation import SafeString
+
+
+_MISSING = object()
+
+
+class _Hasher:
+    def __init__(self):
+        self._hash = blake2b(digest_size=16)
+
+    def update(self, value):
+        if value is _MISSING:
+            self._hash.update(b'-')
+        else:
+            data = str(value).encode('utf-8')
+            marker = b's' if isinstance(value, SafeString) else b'v'
+            self._hash.update(marker + b'%d:' % len(data) + data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def _lookup(mapping, name):
+    try:
+        value = mapping[name]
+    except KeyError:
+        return _MISSING
+
+    return value() if callable(value) else value
+
+
+def fingerprint(renderer, markup, named_args, pos_args):
+    hasher = _Hasher()
+    hasher.update(type(renderer).__module__)
+    hasher.update(type(renderer).__qualname__)
+    hasher.update(markup)
+
+    usage = renderer.analyze_markup(markup)
+    for name in sorted(usage.named):
+        value = _lookup(named_args, name)
+        if value is _MISSING:
+            value = _lookup(renderer.global_named_args, name)
+        hasher.update(name)
+        hasher.update(value)
+    if usage.loop:
+        pos_args = list(pos_args)
+        hasher.update(len(pos_args))
+        for value in pos_args:
+            hasher.update(value)
+    else:
+        for index in sorted(usage.positional):
+            hasher.update(index)
+            try:
+                hasher.update(pos_args[index])
+            except IndexError:
+                hasher.update(_MISSING)
+
+    # Tags only see their call site arguments and the globals, so beyond
+    # the top level only global reads and tag versions matter.
+    for name in sorted(usage.tags):
+        hasher.update(name)
+        if name in usage.missing_tags:
+            hasher.update(_MISSING)
+        else:
+            hasher.update(
+                renderer.get_tag_version(name, renderer.get_tag(name))
+            )
+
+    for name in sorted(usage.globals):
+        hasher.update(name)
+        hasher.update(_lookup(renderer.global_named_args, name))
+
+    return hasher.hexdigest()
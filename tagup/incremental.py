@@ -0,0 +1,148 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from copy import copy
+
+from lark import Token, Tree
+from lark.exceptions import UnexpectedInput
+
+from .exceptions import TagupError
+
+
+def _line_column(markup, pos):
+    line = markup.count('\n', 0, pos) + 1
+    column = pos - markup.rfind('\n', 0, pos)
+
+    return line, column
+
+
+def _shift(node, pos_delta, line_delta, col_line, col_delta):
+    # Positions on line col_line (before shifting lines) also move
+    # horizontally; everything else only moves vertically. Shifted copies
+    # are returned, so the tree the nodes came from is left intact.
+    if not (pos_delta or line_delta or col_delta):
+        return node
+
+    def shift_point(pos, line, column):
+        if line == col_line:
+            column += col_delta
+
+        return pos + pos_delta, line + line_delta, column
+
+    if not isinstance(node, Tree):
+        pos, line, column = shift_point(
+            node.pos_in_stream,
+            node.line,
+            node.column
+        )
+        if node.end_pos is None:
+            end_pos, end_line, end_column = None, None, None
+        else:
+            end_pos, end_line, end_column = shift_point(
+                node.end_pos,
+                node.end_line,
+                node.end_column
+            )
+        return Token(
+            node.type,
+            node.value,
+            pos,
+            line,
+            column,
+            end_line,
+            end_column,
+            end_pos
+        )
+
+    meta = copy(node.meta)
+    if not meta.empty:
+        meta.start_pos, meta.line, meta.column = shift_point(
+            meta.start_pos,
+            meta.line,
+            meta.column
+        )
+        meta.end_pos, meta.end_line, meta.end_column = shift_point(
+            meta.end_pos,
+            meta.end_line,
+            meta.end_column
+        )
+    children = [
+        _shift(child, pos_delta, line_delta, col_line, col_delta)
+        for child in node.children
+    ]
+
+    return Tree(node.data, children, meta)
+
+
+def _span(node):
+    if isinstance(node, Tree):
+        return node.meta.start_pos, node.meta.end_pos
+    else:
+        return node.pos_in_stream, node.end_pos
+
+
+def reparse_markup(renderer, markup, ast, offset, removed, inserted):
+    new_markup = markup[:offset] + inserted + markup[offset + removed:]
+    delta = len(inserted) - removed
+    children = ast.children
+    spans = [_span(child) for child in children]
+    edit_end = offset + removed
+
+    # Children touching the edit may merge with the inserted text, so they
+    # are re-parsed too, along with one extra neighbour on each side.
+    first = next(
+        (i for i, (_, end) in enumerate(spans) if end >= offset),
+        len(children) - 1
+    )
+    last = next(
+        (i for i in reversed(range(len(spans))) if spans[i][0] <= edit_end),
+        0
+    )
+    first = max(0, min(first, last) - 1)
+    last = min(len(children) - 1, max(first, last) + 1)
+    region_start = spans[first][0]
+    region_end = spans[last][1]
+    new_region = new_markup[region_start:region_end + delta]
+
+    try:
+        region_ast = renderer.parse_markup(new_region, track_positions=True)
+    except (TagupError, UnexpectedInput):
+        # The edit reaches beyond the region (an unbalanced bracket, for
+        # example), so only a full parse gives the right answer.
+        return new_markup, renderer.parse_markup(
+            new_markup,
+            track_positions=True
+        )
+
+    start_line, start_column = _line_column(markup, region_start)
+    middle = [
+        _shift(child, region_start, start_line - 1, 1, start_column - 1)
+        for child in region_ast.children
+    ]
+
+    old_end_line, old_end_column = _line_column(markup, region_end)
+    new_end_line, new_end_column = _line_column(
+        new_markup,
+        region_end + delta
+    )
+    suffix = [
+        _shift(
+            child,
+            delta,
+            new_end_line - old_end_line,
+            old_end_line,
+            new_end_column - old_end_column
+        )
+        for child in children[last + 1:]
+    ]
+
+    # Unchanged children before the edit are shared with the input tree.
+    meta = copy(ast.meta)
+    new_ast = Tree(ast.data, children[:first] + middle + suffix, meta)
+    meta.end_pos = len(new_markup)
+    meta.end_line, meta.end_column = _line_column(new_markup, len(new_markup))
+
+    return new_markup, new_ast
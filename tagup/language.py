@@ -4,18 +4,47 @@ See file LICENSE for full license details.
 """
 
 
-from os import path
+import gc
+import os
+import pickle
+import struct
+from collections.abc import Sequence
+from hashlib import blake2b
+from html import escape
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from os import cpu_count, listdir, path, stat
+from random import random
+from time import monotonic, perf_counter
 
 from lark import Lark
 from lark.exceptions import UnexpectedToken
 
-from .evaluation import CommonEvaluator, ControlFlowEvaluator
+from .analysis import analyze_markup, analyze_tags, find_references
+from .arguments import ArgumentScope, LazyPositionalArguments
+from .batch import render_batch
+from .budget import RenderBudget
+from .caching import LRUCacheStore, LRUDict, shared_parse_store
+from .evaluation import CommonEvaluator, ControlFlowEvaluator, SafeString
 from .exceptions import (
     ImproperlyConfigured,
     TagNotFound,
+    TagupRenderingError,
     TagupSyntaxError,
 )
+from .explain import explain
+from .fingerprint import fingerprint
+from .incremental import reparse_markup
+from .parallel import render_parallel
+from .policies import MISSING_POLICIES, MissingReference
+from .shadow import (
+    ShadowMismatch,
+    ShadowStats,
+    describe_error,
+    get_reference_renderer,
+)
 from .stack import TagStack
+from .validation import validate_tags
 
 
 class TrimMixin:
@@ -25,6 +54,173 @@ class TrimMixin:
         return node.strip(self.trim_chars)
 
 
+class AutoescapeMixin:
+    autoescape = True
+    escape_quotes = True
+
+    def escape_value(self, value):
+        if isinstance(value, SafeString):
+            return value
+
+        return escape(value, quote=self.escape_quotes)
+
+
+class CacheMixin:
+    cache_policies = dict()
+    cache_key_arg = 'cache-key'
+    cache_ttl_arg = 'cache-ttl'
+
+    def __init__(self, *args, cache_store=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if cache_store is None:
+            cache_store = LRUCacheStore()
+        self.cache_store = cache_store
+
+    def get_cache_policy(self, name, named_args):
+        if self.cache_key_arg in named_args:
+            ttl = named_args.get(self.cache_ttl_arg)
+            if ttl is not None:
+                try:
+                    ttl = float(ttl)
+                except ValueError:
+                    trace = self.tag_stack.stack_trace(name)
+                    raise TagupRenderingError(
+                        f'invalid {self.cache_ttl_arg} {ttl!r}: {trace}',
+                        tag_stack_trace=trace
+                    )
+            return (named_args[self.cache_key_arg], ttl)
+
+        return self.cache_policies.get(name)
+
+    def get_cache_dependencies(self, name):
+        # Derived keys cover the version of every tag the call can reach and
+        # the globals those tags can read, so edited tags and changed globals
+        # are never served from the cache.
+        usage = self.analyze_tags([name])[name]
+        if usage is None:
+            return (), dict()
+        tag_versions = tuple(
+            (tag_name, self.get_tag_version(tag_name, self.get_tag(tag_name)))
+            for tag_name in sorted((usage.tags | {name}) - usage.missing_tags)
+        )
+        global_named_args = {
+            arg: self.global_named_args[arg]
+            for arg in usage.named | usage.globals
+            if arg in self.global_named_args
+        }
+
+        return tag_versions, global_named_args
+
+    def render_tag(self, name, named_args, pos_args, line, column):
+        policy = self.get_cache_policy(name, named_args)
+        if policy is None:
+            return super().render_tag(
+                name,
+                named_args,
+                pos_args,
+                line,
+                column
+            )
+
+        named_args = {
+            arg: value
+            for arg, value in named_args.items()
+            if arg != self.cache_key_arg and arg != self.cache_ttl_arg
+        }
+        key, ttl = policy
+        if key is None:
+            tag_versions, global_named_args = self.get_cache_dependencies(
+                name
+            )
+            cache_key = (
+                name,
+                frozenset(named_args.items()),
+                tuple(pos_args),
+                tag_versions,
+                frozenset(
+                    (arg, self.provide_value(value))
+                    if callable(value) else (arg, value)
+                    for arg, value in global_named_args.items()
+                ),
+            )
+        else:
+            cache_key = (name, str(key))
+        try:
+            return self.cache_store.get(cache_key)
+        except KeyError:
+            pass
+
+        result = super().render_tag(name, named_args, pos_args, line, column)
+        self.cache_store.set(cache_key, result, ttl)
+
+        return result
+
+
+class ShadowMixin:
+    shadow_rate = 0.01
+
+    def __init__(self, *args, shadow_rate=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if shadow_rate is not None:
+            self.shadow_rate = shadow_rate
+        self.shadow_stats = ShadowStats()
+
+    def render_markup(self, markup, named_args=dict(), pos_args=list()):
+        if self.tag_stack or not (
+            self.shadow_rate >= 1.0 or random() < self.shadow_rate
+        ):
+            return super().render_markup(markup, named_args, pos_args)
+
+        # Both paths need the same positional arguments.
+        pos_args = list(pos_args)
+        start = perf_counter()
+        try:
+            result = super().render_markup(markup, named_args, pos_args)
+        except Exception as err:
+            self.shadow_render(
+                markup,
+                named_args,
+                pos_args,
+                describe_error(err),
+                perf_counter() - start
+            )
+            raise err
+        self.shadow_render(
+            markup,
+            named_args,
+            pos_args,
+            ('result', str(result)),
+            perf_counter() - start
+        )
+
+        return result
+
+    def shadow_render(self, markup, named_args, pos_args, outcome, elapsed):
+        reference = get_reference_renderer(self)
+        start = perf_counter()
+        try:
+            reference_outcome = (
+                'result',
+                str(reference.render_markup(markup, named_args, pos_args)),
+            )
+        except Exception as err:
+            reference_outcome = describe_error(err)
+        reference_elapsed = perf_counter() - start
+
+        stats = self.shadow_stats
+        stats.samples += 1
+        stats.time += elapsed
+        stats.reference_time += reference_elapsed
+        if outcome != reference_outcome:
+            stats.mismatches.append(ShadowMismatch(
+                markup,
+                named_args,
+                pos_args,
+                outcome,
+                reference_outcome
+            ))
+
+
 class StaticTagMixin:
     tags = None
 
@@ -33,6 +229,10 @@ class StaticTagMixin:
             raise ImproperlyConfigured(
                 'StaticTagMixin and TagDictMixin are mutually exclusive'
             )
+        if FileSystemTagMixin in self.__class__.__bases__:
+            raise ImproperlyConfigured(
+                'StaticTagMixin and FileSystemTagMixin are mutually exclusive'
+            )
 
         super().__init__(*args, **kwargs)
         if self.tags is None:
@@ -47,6 +247,12 @@ class StaticTagMixin:
 
         return result
 
+    def has_tag(self, name):
+        return name in self.tags
+
+    def get_tag_names(self):
+        return self.tags.keys()
+
 
 class TagDictMixin:
     def __init__(self, tags=dict(), *args, **kwargs):
@@ -54,6 +260,10 @@ class TagDictMixin:
             raise ImproperlyConfigured(
                 'TagDictMixin and StaticTagMixin are mutually exclusive'
             )
+        if FileSystemTagMixin in self.__class__.__bases__:
+            raise ImproperlyConfigured(
+                'TagDictMixin and FileSystemTagMixin are mutually exclusive'
+            )
 
         super().__init__(*args, **kwargs)
         self.tags = tags.copy()
@@ -61,6 +271,12 @@ class TagDictMixin:
     def get_tag(self, name):
         return self.tags[name]
 
+    def has_tag(self, name):
+        return name in self.tags
+
+    def get_tag_names(self):
+        return self.tags.keys()
+
     def __getitem__(self, key):
         return self.tags[key]
 
@@ -71,17 +287,266 @@ class TagDictMixin:
         del self.tags[key]
 
 
+class FileSystemTagMixin:
+    tag_dir = None
+    tag_suffix = '.tagup'
+    revalidate_interval = 1.0
+
+    def __init__(
+        self,
+        *args,
+        tag_dir=None,
+        revalidate_interval=None,
+        **kwargs
+    ):
+        for mixin in (StaticTagMixin, TagDictMixin):
+            if mixin in self.__class__.__bases__:
+                raise ImproperlyConfigured(
+                    'FileSystemTagMixin and {} are mutually exclusive'.format(
+                        mixin.__name__
+                    )
+                )
+
+        super().__init__(*args, **kwargs)
+        if tag_dir is not None:
+            self.tag_dir = tag_dir
+        if revalidate_interval is not None:
+            self.revalidate_interval = revalidate_interval
+        if self.tag_dir is None:
+            raise ImproperlyConfigured(
+                '{cls} must define {cls}.tag_dir'.format(
+                    cls=self.__class__.__name__
+                )
+            )
+        # Maps tag names to [markup, (mtime, size), last validation time].
+        self.tag_files = dict()
+
+    def get_tag_filepath(self, name):
+        return path.join(self.tag_dir, name + self.tag_suffix)
+
+    def load_tag(self, name, now):
+        entry = self.tag_files.get(name)
+        if entry is not None and now - entry[2] < self.revalidate_interval:
+            return entry[0]
+
+        filepath = self.get_tag_filepath(name)
+        try:
+            stat_result = stat(filepath)
+        except OSError:
+            if entry is not None:
+                self.evict_tag(name)
+            raise
+        signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        if entry is not None and entry[1] == signature:
+            entry[2] = now
+            return entry[0]
+
+        with open(filepath) as f_in:
+            markup = f_in.read()
+        if entry is not None:
+            self.evict_tag(name)
+        self.tag_files[name] = [markup, signature, now]
+
+        return markup
+
+    def evict_tag(self, name):
+        markup = self.tag_files.pop(name)[0]
+        self.tag_asts.pop(markup, None)
+        self.references.pop(markup, None)
+
+    def get_tag(self, name):
+        return self.load_tag(name, monotonic())
+
+    def has_tag(self, name):
+        try:
+            self.load_tag(name, monotonic())
+        except OSError:
+            return False
+
+        return True
+
+    def get_tag_names(self):
+        return [
+            filename[:-len(self.tag_suffix)]
+            for filename in sorted(listdir(self.tag_dir))
+            if filename.endswith(self.tag_suffix)
+        ]
+
+    def prefetch_tags(self, tag_names):
+        now = monotonic()
+        for name in tag_names:
+            # Missing or malformed tags are skipped here so that render_tag
+            # can report them with a proper stack trace.
+            try:
+                markup = self.load_tag(name, now)
+                if markup not in self.tag_asts:
+                    self.tag_asts[markup] = self.parse_shared_markup(markup)
+            except (OSError, TagupSyntaxError):
+                continue
+
+
 class BaseRenderer:
-    def __init__(self, max_depth=8):
+    autoescape = False
+    missing_tag_policy = 'raise'
+    missing_argument_policy = 'raise'
+    pos_args_buffer_size = 1024
+
+    def __init__(
+        self,
+        max_depth=8,
+        max_nodes=None,
+        max_output_size=None,
+        max_tag_calls=None,
+        timeout=None,
+        memoize_tags=True,
+        sampler=None,
+        parse_store=None,
+        recorder=None,
+        max_tag_asts=1024,
+    ):
+        for policy in (self.missing_tag_policy, self.missing_argument_policy):
+            if policy not in MISSING_POLICIES:
+                raise ImproperlyConfigured(
+                    f'invalid missing reference policy {policy!r}'
+                )
         self.tag_stack = TagStack(max_depth)
+        self.missing_references = []
+        if parse_store is None:
+            parse_store = shared_parse_store
+        self.parse_store = parse_store
+        self.recorder = recorder
+        self.sampler = sampler
+        self.tag_memo = dict() if memoize_tags else None
+        self.provided_values = dict()
         self.global_named_args = dict()
+        # Parsed tags and the references found in analyzed markup are kept
+        # per renderer, bounded so that generated tag bodies and one-off
+        # documents cannot grow them without limit.
+        self.tag_asts = LRUDict(max_tag_asts)
+        self.references = LRUDict(max_tag_asts)
+        if any(
+            limit is not None
+            for limit
+            in (max_nodes, max_output_size, max_tag_calls, timeout)
+        ):
+            self.budget = RenderBudget(
+                self.tag_stack,
+                max_nodes=max_nodes,
+                max_output_size=max_output_size,
+                max_tag_calls=max_tag_calls,
+                timeout=timeout,
+            )
+        else:
+            self.budget = None
 
     def render_markup(self, markup, named_args=dict(), pos_args=list()):
-        ast = self.parse_markup(markup)
-        result = self.evaluate_ast(ast, named_args, pos_args)
+        if self.tag_stack:
+            ast = self.parse_markup(markup)
+            return self.evaluate_ast(ast, named_args, pos_args)
+
+        if self.recorder is not None:
+            return self.record_render(markup, named_args, pos_args)
+
+        return self.render_document(markup, named_args, pos_args)
+
+    def render_document(self, markup, named_args, pos_args):
+        self.begin_render()
+        try:
+            ast = self.parse_markup(markup)
+            if not isinstance(pos_args, Sequence):
+                pos_args = self.stream_pos_args(ast, pos_args)
+            result = self.evaluate_ast(ast, named_args, pos_args)
+        finally:
+            self.end_render()
+
+        return result
+
+    def record_render(self, markup, named_args, pos_args):
+        # Recorded positional arguments are written out, so they are
+        # materialized up front.
+        pos_args = list(pos_args)
+        start = perf_counter()
+        self.begin_render()
+        try:
+            # Renders are recorded before end_render so that the recorder
+            # can reuse values already provided during the render.
+            try:
+                ast = self.parse_markup(markup)
+                result = self.evaluate_ast(ast, named_args, pos_args)
+            except Exception as err:
+                self.recorder.record(
+                    self,
+                    markup,
+                    named_args,
+                    pos_args,
+                    describe_error(err),
+                    perf_counter() - start
+                )
+                raise err
+            self.recorder.record(
+                self,
+                markup,
+                named_args,
+                pos_args,
+                ('result', str(result)),
+                perf_counter() - start
+            )
+        finally:
+            self.end_render()
 
         return result
 
+    def stream_pos_args(self, ast, pos_args):
+        pos_args = LazyPositionalArguments(
+            pos_args,
+            buffer_size=self.pos_args_buffer_size,
+            tag_stack=self.tag_stack
+        )
+        # Markup that loops over its positional arguments more than once,
+        # through nested or sibling loops, needs every item again.
+        if len(list(ast.find_data('positional_loop'))) > 1:
+            pos_args.retain()
+
+        return pos_args
+
+    def render_batch(self, markup, arg_sets):
+        return render_batch(self, markup, arg_sets)
+
+    def render_parallel(
+        self,
+        markup,
+        executor,
+        named_args=dict(),
+        pos_args=list(),
+        chunks=None,
+    ):
+        if chunks is None:
+            chunks = 4 * (cpu_count() or 1)
+
+        return render_parallel(
+            self,
+            markup,
+            named_args,
+            pos_args,
+            executor,
+            chunks
+        )
+
+    def begin_render(self):
+        self.missing_references = []
+        if self.budget is not None:
+            self.budget.start()
+        if self.sampler is not None:
+            self.sampler.begin_render()
+
+    def end_render(self):
+        if self.tag_memo:
+            self.tag_memo.clear()
+        if self.provided_values:
+            self.provided_values.clear()
+        if self.sampler is not None:
+            self.sampler.end_render()
+
     def get_tag(self, name):
         raise ImproperlyConfigured(
             '{cls} must define {cls}.get_tag()'.format(
@@ -89,7 +554,66 @@ class BaseRenderer:
             )
         )
 
+    def has_tag(self, name):
+        try:
+            self.get_tag(name)
+        except ImproperlyConfigured as err:
+            raise err
+        except Exception:
+            return False
+
+        return True
+
+    def get_tag_names(self):
+        raise ImproperlyConfigured(
+            '{cls} must define {cls}.get_tag_names()'.format(
+                cls=self.__class__.__name__
+            )
+        )
+
+    def render_missing(self, kind, name, line=None, column=None):
+        if kind == 'tag':
+            policy = self.missing_tag_policy
+        else:
+            policy = self.missing_argument_policy
+        if policy == 'placeholder':
+            return self.get_placeholder(kind, name)
+        if policy == 'warn':
+            self.missing_references.append(MissingReference(
+                kind,
+                name,
+                self.tag_stack.tag_names(),
+                line,
+                column
+            ))
+
+        return ''
+
+    def get_placeholder(self, kind, name):
+        if kind == 'tag':
+            return f'[{name}]'
+
+        return f'[\\\\{name}]'
+
     def render_tag(self, name, named_args, pos_args, line, column):
+        if self.tag_memo is not None:
+            # Depth is part of the key so that memoized results can never
+            # mask a stack overflow.
+            memo_key = (
+                name,
+                len(self.tag_stack),
+                frozenset(named_args.items()),
+                tuple(pos_args),
+            )
+            try:
+                return self.tag_memo[memo_key]
+            except KeyError:
+                pass
+
+        # Missing tags are looked up without raising unless the policy
+        # wants the exception anyway.
+        if self.missing_tag_policy != 'raise' and not self.has_tag(name):
+            return self.render_missing('tag', name, line, column)
         try:
             tag_markup = self.get_tag(name)
         except ImproperlyConfigured as err:
@@ -101,20 +625,50 @@ class BaseRenderer:
                 tag_stack_trace=trace
             )
 
+        missing_count = len(self.missing_references)
         self.tag_stack.push(name, line, column)
+        if sampling := self.sampler is not None and self.sampler.active:
+            self.sampler.enter()
         try:
-            result = self.render_markup(tag_markup, named_args, pos_args)
+            if self.budget is not None:
+                self.budget.charge_tag_call()
+            ast = self.parse_tag_markup(tag_markup)
+            result = self.evaluate_ast(ast, named_args, pos_args)
         finally:
+            if sampling:
+                self.sampler.exit(self.tag_stack.tag_names())
             self.tag_stack.pop()
 
+        # Results that reported missing references are not memoized, so
+        # every call reports them just as it would without memoization.
+        if (
+            self.tag_memo is not None
+            and len(self.missing_references) == missing_count
+        ):
+            self.tag_memo[memo_key] = result
+
         return result
 
+    def provide_value(self, provider):
+        # Named arguments given as callables are only computed when they are
+        # substituted, and at most once per render.
+        try:
+            value = self.provided_values[provider]
+        except KeyError:
+            value = self.provided_values[provider] = provider()
+
+        return value
+
     def set_globals(self, global_named_args):
         self.global_named_args = global_named_args
 
-    def parse_markup(self, markup):
+    def parse_markup(self, markup, track_positions=False):
+        if track_positions:
+            parser = self.get_positional_parser()
+        else:
+            parser = self.get_parser()
         try:
-            result = self.get_parser().parse(markup)
+            result = parser.parse(markup)
         except UnexpectedToken as err:
             trace = self.tag_stack.stack_trace(
                 token if (token := str(err.token)) else 'END',
@@ -128,30 +682,184 @@ class BaseRenderer:
 
         return result
 
-    def evaluate_ast(self, ast, named_args, pos_args):
-        combined_named_args = {**self.global_named_args, **named_args}
+    def parse_shared_markup(self, markup):
+        # Only tag bodies go through the parse store; one-off documents are
+        # never kept alive by it.
+        store_key = self.get_parse_store_key(markup)
+        try:
+            return self.parse_store.get(store_key)
+        except KeyError:
+            pass
+
+        return self.parse_store.set(store_key, self.parse_markup(markup))
 
-        cf_eval = ControlFlowEvaluator(
-            named_args=combined_named_args,
-            pos_args=pos_args,
-            hook_manager=self,
+    def get_parse_store_key(self, markup):
+        return (
+            self.get_grammar(),
+            blake2b(markup.encode(), digest_size=16).digest(),
         )
-        intermediate = cf_eval.traverse(ast)
 
-        if hasattr(self, 'prefetch_tags'):
-            if tag_names := self.discover_tags(intermediate):
-                self.prefetch_tags(tag_names)
+    def get_references(self, markup):
+        try:
+            references = self.references[markup]
+        except KeyError:
+            try:
+                ast = self.tag_asts[markup]
+            except KeyError:
+                ast = self.parse_markup(markup)
+            references = self.references[markup] = find_references(ast)
+
+        return references
+
+    def analyze_tags(self, tag_names=None):
+        if tag_names is None:
+            tag_names = self.get_tag_names()
+
+        return analyze_tags(self, tag_names)
+
+    def analyze_markup(self, markup):
+        return analyze_markup(self, markup)
+
+    def validate_tags(self, tag_names=None, jobs=1):
+        if tag_names is None:
+            tag_names = self.get_tag_names()
+
+        return validate_tags(self, tag_names, jobs)
 
-        c_eval = CommonEvaluator(
-            named_args=combined_named_args,
-            pos_args=pos_args,
-            hook_manager=self,
-            renderer=self,
+    def explain(self, markup, named_args=dict(), pos_args=list()):
+        return explain(self, markup, named_args, pos_args)
+
+    def get_tag_version(self, name, markup):
+        return markup
+
+    def fingerprint(self, markup, named_args=dict(), pos_args=list()):
+        return fingerprint(self, markup, named_args, pos_args)
+
+    def reparse_markup(self, markup, ast, offset, removed, inserted):
+        return reparse_markup(self, markup, ast, offset, removed, inserted)
+
+    def parse_tag_markup(self, markup):
+        try:
+            ast = self.tag_asts[markup]
+        except KeyError:
+            ast = self.tag_asts[markup] = self.parse_shared_markup(markup)
+
+        return ast
+
+    def warm(self, tag_names=None, freeze=True):
+        self.get_parser()
+        if tag_names is None:
+            tag_names = self.get_tag_names()
+        # Warmed tags are pinned, so the cache bound never drops part of the
+        # library and lookups leave the frozen pages untouched.
+        for name in tag_names:
+            markup = self.get_tag(name)
+            try:
+                ast = self.tag_asts[markup]
+            except KeyError:
+                ast = self.parse_shared_markup(markup)
+            self.tag_asts.pin(markup, ast)
+
+        if freeze:
+            gc.collect()
+            gc.freeze()
+
+    def export_tag_asts(self, name=None):
+        data = pickle.dumps(self.tag_asts, pickle.HIGHEST_PROTOCOL)
+        header = struct.pack('<Q', len(data))
+        shm = SharedMemory(name, create=True, size=len(header) + len(data))
+        shm.buf[:len(header)] = header
+        shm.buf[len(header):len(header) + len(data)] = data
+
+        return shm
+
+    def import_tag_asts(self, name):
+        try:
+            shm = SharedMemory(name, track=False)
+        except TypeError:
+            shm = SharedMemory(name)
+            # Before Python 3.13 attaching registers the segment with this
+            # process's resource tracker, which would unlink it on exit.
+            if os.name == 'posix':
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        try:
+            header_size = struct.calcsize('<Q')
+            (size,) = struct.unpack_from('<Q', shm.buf)
+            tag_asts = pickle.loads(shm.buf[header_size:header_size + size])
+        finally:
+            shm.close()
+        # Imported tags are a warmed library, so they are pinned as well.
+        for markup, ast in tag_asts.items():
+            self.tag_asts.pin(markup, ast)
+
+    def evaluate_ast(self, ast, named_args, pos_args):
+        combined_named_args = self.combine_named_args(named_args)
+        intermediate = self.evaluate_control_flow(
+            ast,
+            combined_named_args,
+            pos_args
+        )
+        result = self.evaluate_common(
+            intermediate,
+            combined_named_args,
+            pos_args
         )
-        result = c_eval.traverse(intermediate)
 
         return result
 
+    def combine_named_args(self, named_args):
+        # Tags only see their own named arguments on top of the globals, so
+        # a thin layer is pushed instead of copying the global dict.
+        if not named_args:
+            result = self.global_named_args
+        elif not self.global_named_args:
+            result = named_args
+        else:
+            result = ArgumentScope(named_args, self.global_named_args)
+
+        return result
+
+    def evaluate_control_flow(self, ast, combined_named_args, pos_args):
+        cf_eval, _, prefetch_tags = self.get_evaluators()
+
+        # Control flow evaluation never re-enters the renderer, so there is
+        # no context to restore afterwards.
+        cf_eval.bind(combined_named_args, pos_args)
+        result = cf_eval.traverse(ast)
+
+        if prefetch_tags is not None:
+            if tag_names := self.discover_tags(result):
+                prefetch_tags(tag_names)
+
+        return result
+
+    def evaluate_common(self, ast, combined_named_args, pos_args):
+        _, c_eval, _ = self.get_evaluators()
+
+        # Common evaluation re-enters evaluate_ast through render_tag, so the
+        # outer context is restored afterwards.
+        context = c_eval.bind(combined_named_args, pos_args)
+        try:
+            result = c_eval.traverse(ast)
+        finally:
+            c_eval.bind(*context)
+        if self.autoescape:
+            result = SafeString(result)
+
+        return result
+
+    def get_evaluators(self):
+        try:
+            evaluators = self.evaluators
+        except AttributeError:
+            evaluators = self.evaluators = (
+                ControlFlowEvaluator(hook_manager=self),
+                CommonEvaluator(hook_manager=self, renderer=self),
+                getattr(self, 'prefetch_tags', None),
+            )
+
+        return evaluators
+
     def discover_tags(self, ast):
         tag_nodes = ast.find_data('tag')
 
@@ -181,3 +889,15 @@ class BaseRenderer:
             parser = self.parser = Lark(self.get_grammar(), parser='lalr')
 
         return parser
+
+    def get_positional_parser(self):
+        try:
+            parser = self.positional_parser
+        except AttributeError:
+            parser = self.positional_parser = Lark(
+                self.get_grammar(),
+                parser='lalr',
+                propagate_positions=True
+            )
+
+        return parser
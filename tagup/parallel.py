@@ -0,0 +1,102 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from lark import Tree
+
+from .evaluation import SafeString
+from .exceptions import ImproperlyConfigured
+
+
+_worker_renderer = None
+
+
+def _init_worker(renderer_factory):
+    global _worker_renderer
+    _worker_renderer = renderer_factory()
+    try:
+        _worker_renderer.warm(freeze=False)
+    except ImproperlyConfigured:
+        # Renderers that cannot list their tags parse them on demand.
+        pass
+
+
+def create_render_pool(renderer_factory, jobs=None):
+    return ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(renderer_factory,)
+    )
+
+
+def _render_chunk(nodes, global_named_args, named_args, pos_args):
+    renderer = _worker_renderer
+    renderer.set_globals(global_named_args)
+    combined_named_args = renderer.combine_named_args(named_args)
+    _, c_eval, _ = renderer.get_evaluators()
+
+    renderer.begin_render()
+    context = c_eval.bind(combined_named_args, pos_args)
+    try:
+        results = [
+            c_eval.traverse(node) if isinstance(node, Tree) else str(node)
+            for node in nodes
+        ]
+    finally:
+        c_eval.bind(*context)
+        renderer.end_render()
+
+    return results, renderer.missing_references
+
+
+def render_parallel(renderer, markup, named_args, pos_args, executor, chunks):
+    # Workers need every positional argument up front.
+    pos_args = list(pos_args)
+
+    renderer.begin_render()
+    try:
+        ast = renderer.parse_markup(markup)
+        combined_named_args = renderer.combine_named_args(named_args)
+        intermediate = renderer.evaluate_control_flow(
+            ast,
+            combined_named_args,
+            pos_args
+        )
+
+        # Once control flow is resolved the root's children are
+        # independent, so only the root block itself is evaluated here.
+        children = intermediate.children
+        chunk_size = max(1, -(-len(children) // chunks))
+        results = []
+        for chunk_results, missing_references in executor.map(
+            _render_chunk,
+            [
+                children[i:i + chunk_size]
+                for i in range(0, len(children), chunk_size)
+            ],
+            repeat(renderer.global_named_args),
+            repeat(named_args),
+            repeat(pos_args)
+        ):
+            results.extend(chunk_results)
+            renderer.missing_references.extend(missing_references)
+            if renderer.budget is not None:
+                renderer.budget.charge_output(sum(map(len, chunk_results)))
+
+        _, c_eval, _ = renderer.get_evaluators()
+        context = c_eval.bind(combined_named_args, pos_args)
+        try:
+            result = c_eval.process(Tree(intermediate.data, results))
+        finally:
+            c_eval.bind(*context)
+        if renderer.autoescape:
+            result = SafeString(result)
+    finally:
+        renderer.end_render()
+
+    return result
@@ -0,0 +1,23 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+MISSING_POLICIES = ('raise', 'empty', 'placeholder', 'warn')
+
+
+class MissingReference:
+    def __init__(self, kind, name, tag_names, line=None, column=None):
+        self.kind = kind
+        self.name = name
+        self.tag_names = tag_names
+        self.line = line
+        self.column = column
+
+    def __str__(self):
+        location = ' -> '.join(('ROOT',) + self.tag_names)
+        if self.line is not None and self.column is not None:
+            location += f':{self.line},{self.column}'
+
+        return f'{location}: missing {self.kind} {self.name}'
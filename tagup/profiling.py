@@ -0,0 +1,51 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from collections import defaultdict
+from random import random
+from time import perf_counter
+
+
+class StackSampler:
+    root_name = 'ROOT'
+
+    def __init__(self, rate=1.0):
+        self.rate = rate
+        self.active = False
+        self.samples = defaultdict(float)
+        self._frames = []
+
+    def begin_render(self):
+        self.active = self.rate >= 1.0 or random() < self.rate
+        if self.active:
+            self._frames = [[perf_counter(), 0.0]]
+
+    def end_render(self):
+        if self.active:
+            self.exit(())
+            self.active = False
+
+    def enter(self):
+        self._frames.append([perf_counter(), 0.0])
+
+    def exit(self, tag_names):
+        start, child_time = self._frames.pop()
+        elapsed = perf_counter() - start
+        self.samples[tag_names] += elapsed - child_time
+        if self._frames:
+            self._frames[-1][1] += elapsed
+
+    def collapsed(self):
+        for tag_names, seconds in sorted(self.samples.items()):
+            stack = ';'.join((self.root_name,) + tag_names)
+            yield f'{stack} {round(seconds * 1e6)}'
+
+    def write_collapsed(self, f_out):
+        for line in self.collapsed():
+            f_out.write(line + '\n')
+
+    def clear(self):
+        self.samples.clear()
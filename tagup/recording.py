@@ -0,0 +1,302 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+import json
+from difflib import unified_diff
+from hashlib import blake2b
+from math import ceil
+from threading import Lock
+from time import perf_counter
+
+from .shadow import describe_error
+
+
+def _digest(value):
+    return blake2b(str(value).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def analyze(renderer, markup):
+    # Markup that cannot be analyzed, such as markup with syntax errors, is
+    # still recorded and replayed, just without usage information.
+    try:
+        return renderer.analyze_markup(markup)
+    except Exception:
+        return None
+
+
+def get_tag_versions(renderer, usage):
+    if usage is None:
+        return dict()
+
+    return {
+        name: _digest(renderer.get_tag_version(name, renderer.get_tag(name)))
+        for name in sorted(usage.tags - usage.missing_tags)
+    }
+
+
+def get_recorded_args(renderer, named_args, names):
+    recorded = dict()
+    for name, value in named_args.items():
+        if names is not None and name not in names:
+            continue
+        if callable(value):
+            # Providers are never called again; those the render did not
+            # call were not read and are left out.
+            try:
+                value = renderer.provided_values[value]
+            except KeyError:
+                continue
+        recorded[name] = str(value)
+
+    return recorded
+
+
+class RenderRecorder:
+    # Every render is appended as one JSON line:
+    #   m        markup digest, with "markup" holding the text the first time
+    #            a recorder sees it
+    #   g        digest of the globals read, with "globals" likewise
+    #   n, p     named and positional arguments
+    #   t        digests of the versions of every tag the markup reaches
+    #   o        output digest, with "output" holding the text if store_output
+    #            is set, or e for the description of an error instead
+    #   d        seconds taken
+    def __init__(self, filepath, store_markup=True, store_output=False):
+        self.filepath = filepath
+        self.store_markup = store_markup
+        self.store_output = store_output
+        self.seen = set()
+        self.lock = Lock()
+        self.file = None
+
+    def record(self, renderer, markup, named_args, pos_args, outcome, elapsed):
+        usage = analyze(renderer, markup)
+        # Only arguments the markup can read are recorded.
+        if usage is None:
+            named_names = global_names = None
+        else:
+            named_names = usage.named
+            global_names = usage.named | usage.globals
+        global_named_args = get_recorded_args(
+            renderer,
+            renderer.global_named_args,
+            global_names
+        )
+        entry = {
+            'm': _digest(markup),
+            'g': _digest(json.dumps(global_named_args, sort_keys=True)),
+            'n': get_recorded_args(renderer, named_args, named_names),
+            'p': [str(value) for value in pos_args],
+            't': get_tag_versions(renderer, usage),
+        }
+        kind, value = outcome
+        if kind == 'result':
+            entry['o'] = _digest(value)
+            if self.store_output:
+                entry['output'] = value
+        else:
+            entry['e'] = value
+        entry['d'] = round(elapsed, 6)
+
+        with self.lock:
+            if entry['m'] not in self.seen and self.store_markup:
+                entry['markup'] = markup
+                self.seen.add(entry['m'])
+            if entry['g'] not in self.seen:
+                entry['globals'] = global_named_args
+                self.seen.add(entry['g'])
+            if self.file is None:
+                self.file = open(self.filepath, 'a', encoding='utf-8')
+            self.file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class RecordedRender:
+    def __init__(
+        self,
+        markup,
+        named_args,
+        pos_args,
+        global_named_args,
+        tag_versions,
+        outcome,
+        output=None,
+    ):
+        self.markup = markup
+        self.named_args = named_args
+        self.pos_args = pos_args
+        self.global_named_args = global_named_args
+        self.tag_versions = tag_versions
+        # Either ('result', output digest) or ('error', description).
+        self.outcome = outcome
+        self.output = output
+
+
+def read_recording(filepath):
+    # Markup and globals are written once and referenced by digest, so the
+    # whole file is read before any record is resolved. Records whose markup
+    # was never written are skipped.
+    with open(filepath, encoding='utf-8') as f_in:
+        entries = [json.loads(line) for line in f_in if line.strip()]
+    markups = {e['m']: e['markup'] for e in entries if 'markup' in e}
+    globals_ = {e['g']: e['globals'] for e in entries if 'globals' in e}
+
+    records = []
+    skipped = 0
+    for entry in entries:
+        try:
+            markup = markups[entry['m']]
+            global_named_args = globals_[entry['g']]
+        except KeyError:
+            skipped += 1
+            continue
+        if 'e' in entry:
+            outcome = ('error', entry['e'])
+        else:
+            outcome = ('result', entry['o'])
+        records.append(RecordedRender(
+            markup,
+            entry['n'],
+            entry['p'],
+            global_named_args,
+            entry['t'],
+            outcome,
+            entry.get('output')
+        ))
+
+    return records, skipped
+
+
+class ReplayDifference:
+    def __init__(self, index, record, outcome, output=None):
+        self.index = index
+        self.record = record
+        self.outcome = outcome
+        self.output = output
+
+    def __str__(self):
+        lines = [
+            f'record {self.index}: expected {self.record.outcome[0]} '
+            f'{self.record.outcome[1]}, got {self.outcome[0]} '
+            f'{self.outcome[1]}'
+        ]
+        if self.record.output is not None and self.output is not None:
+            lines.extend(
+                line.rstrip('\n')
+                for line in unified_diff(
+                    self.record.output.splitlines(True),
+                    self.output.splitlines(True),
+                    'recorded',
+                    'replayed'
+                )
+            )
+
+        return '\n'.join(lines)
+
+
+def percentile(values, fraction):
+    # Nearest rank percentile of already sorted values.
+    if not values:
+        return 0.0
+
+    return values[max(0, ceil(len(values) * fraction) - 1)]
+
+
+class ReplayReport:
+    def __init__(self, count, skipped, elapsed, latencies, differences, stale):
+        self.count = count
+        self.skipped = skipped
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+        self.differences = differences
+        # Records rendered against tags that changed since recording.
+        self.stale = stale
+
+    @property
+    def throughput(self):
+        return self.count / (self.elapsed or float('inf'))
+
+    def as_dict(self):
+        return {
+            'renders': self.count,
+            'skipped': self.skipped,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput,
+            'latency': {
+                f'p{p}': percentile(self.latencies, p / 100)
+                for p in (50, 90, 99)
+            },
+            'differences': len(self.differences),
+            'stale': self.stale,
+        }
+
+    def __str__(self):
+        latency = ', '.join(
+            f'p{p} {1e3 * percentile(self.latencies, p / 100):.2f}ms'
+            for p in (50, 90, 99)
+        )
+        lines = [
+            f'replayed {self.count} renders ({self.skipped} skipped) '
+            f'in {self.elapsed:.3f}s',
+            f'  throughput: {self.throughput:.1f} renders/s',
+            f'  latency: {latency}',
+            f'  differences: {len(self.differences)} '
+            f'({self.stale} records use changed tags)',
+        ]
+        lines.extend(
+            '  ' + line
+            for difference in self.differences
+            for line in str(difference).splitlines()
+        )
+
+        return '\n'.join(lines)
+
+
+def replay(renderer, records, skipped=0, repeat=1):
+    stale = sum(
+        get_tag_versions(renderer, analyze(renderer, record.markup))
+        != record.tag_versions
+        for record in records
+    )
+
+    latencies = []
+    differences = []
+    start = perf_counter()
+    for index, record in enumerate(records):
+        renderer.set_globals(record.global_named_args)
+        for _ in range(repeat):
+            render_start = perf_counter()
+            try:
+                output = str(renderer.render_markup(
+                    record.markup,
+                    record.named_args,
+                    record.pos_args
+                ))
+            except Exception as err:
+                output = None
+                outcome = describe_error(err)
+            else:
+                outcome = ('result', _digest(output))
+            latencies.append(perf_counter() - render_start)
+        if outcome != record.outcome:
+            differences.append(
+                ReplayDifference(index, record, outcome, output)
+            )
+
+    return ReplayReport(
+        len(latencies),
+        skipped,
+        perf_counter() - start,
+        latencies,
+        differences,
+        stale
+    )
@@ -0,0 +1,62 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from copy import copy, deepcopy
+
+from .caching import LRUCacheStore, ParseStore
+
+
+class ShadowMismatch:
+    def __init__(self, markup, named_args, pos_args, result, reference):
+        self.markup = markup
+        self.named_args = named_args
+        self.pos_args = pos_args
+        # Each outcome is ('result', output) or ('error', description).
+        self.result = result
+        self.reference = reference
+
+
+class ShadowStats:
+    def __init__(self):
+        self.samples = 0
+        self.mismatches = []
+        self.time = 0.0
+        self.reference_time = 0.0
+
+    @property
+    def latency_delta(self):
+        if not self.samples:
+            return 0.0
+
+        return (self.time - self.reference_time) / self.samples
+
+
+def get_reference_renderer(renderer):
+    # A copy of the renderer that shares its tags and configuration but
+    # none of its caches, so it always takes the plain parse and two pass
+    # evaluation path.
+    reference = copy(renderer)
+    reference.shadow_rate = 0.0
+    reference.recorder = None
+    reference.tag_stack = deepcopy(renderer.tag_stack)
+    reference.missing_references = []
+    reference.parse_store = ParseStore(max_size=0)
+    reference.tag_asts = dict()
+    reference.references = dict()
+    reference.tag_memo = None
+    reference.sampler = None
+    if renderer.budget is not None:
+        reference.budget = copy(renderer.budget)
+        reference.budget.tag_stack = reference.tag_stack
+    if hasattr(renderer, 'cache_store'):
+        reference.cache_store = LRUCacheStore(max_size=0)
+    reference.__dict__.pop('evaluators', None)
+
+    return reference
+
+
+def describe_error(err):
+    return ('error', f'{err.__class__.__name__}: {err}')
@@ -41,6 +41,16 @@ class TagStack:
         self._capacity = max_depth
         self._entries = []
 
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def max_depth(self):
+        return self._capacity
+
+    def tag_names(self):
+        return tuple(e.tag_name for e in self._entries)
+
     def push(self, tag_name, line, column):
         self._entries.append(StackEntry(tag_name, line, column))
         if len(self._entries) > self._capacity:
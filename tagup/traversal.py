@@ -70,9 +70,13 @@ class BaseTraverser:
         return node
 
 
+# Traversers never modify the tree they walk; every evaluated node is a new
+# Tree, so one parsed tree can be evaluated any number of times.
+
+
 class PostOrderTraverser(BaseTraverser):
     def traverse(self, node):
-        node.children = self.traverse_children(node)
+        node = Tree(node.data, self.traverse_children(node))
         node = self.process(node)
 
         return node
@@ -81,6 +85,6 @@ class PostOrderTraverser(BaseTraverser):
 class PreOrderTraverser(BaseTraverser):
     def traverse(self, node):
         node = self.process(node)
-        node.children = self.traverse_children(node)
+        node = Tree(node.data, self.traverse_children(node))
 
         return node
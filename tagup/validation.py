@@ -0,0 +1,257 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from concurrent.futures import ProcessPoolExecutor
+
+from lark import Lark, Token
+from lark.exceptions import UnexpectedInput, UnexpectedToken
+
+from .incremental import _line_column
+
+
+MAX_SYNTAX_ERRORS = 100
+
+
+class Problem:
+    def __init__(self, kind, tag, message, line=None, column=None):
+        self.kind = kind
+        self.tag = tag
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'tag': self.tag,
+            'line': self.line,
+            'column': self.column,
+            'message': self.message,
+        }
+
+
+class ValidationReport:
+    def __init__(self, tag_count, problems):
+        self.tag_count = tag_count
+        self.problems = sorted(
+            problems,
+            key=lambda p: (p.tag, p.line or 0, p.column or 0, p.kind)
+        )
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def as_dict(self):
+        return {
+            'tags': self.tag_count,
+            'problems': [problem.as_dict() for problem in self.problems],
+        }
+
+
+def _original_position(deletions, pos):
+    for start, length in reversed(deletions):
+        if pos >= start:
+            pos += length
+
+    return pos
+
+
+def check_markup(parser, markup):
+    # Each syntax error is recovered from by deleting the offending token
+    # and parsing again, so every error is found in a single pass. Returns
+    # the syntax errors, as (line, column, token), and the tag calls of the
+    # recovered tree, as (name, line, column).
+    errors = []
+    deletions = []
+    # Deleted tokens as (start, end) in the original markup.
+    deleted = []
+    text = markup
+    last_end = None
+    while True:
+        try:
+            ast = parser.parse(text)
+        except UnexpectedInput as err:
+            if isinstance(err, UnexpectedToken):
+                token = str(err.token)
+            else:
+                token = text[err.pos_in_stream]
+            if not token:
+                # Running out of input after a recovery usually means a
+                # deleted bracket, so only a genuine END error is reported.
+                if not errors:
+                    errors.append((err.line, err.column, 'END'))
+                return errors, None
+            # Tokens deleted back to back stem from a single mistake, so
+            # only the first of them is reported.
+            pos = _original_position(deletions, err.pos_in_stream)
+            deleted.append((pos, pos + len(token)))
+            if pos != last_end:
+                errors.append(_line_column(markup, pos) + (token,))
+                if len(errors) >= MAX_SYNTAX_ERRORS:
+                    return errors, None
+            last_end = pos + len(token)
+            start = err.pos_in_stream
+            text = text[:start] + text[start + len(token):]
+            deletions.append((start, len(token)))
+        else:
+            break
+
+    calls = []
+    for node in ast.find_data('tag'):
+        name = node.children[0]
+        pos = _original_position(deletions, name.pos_in_stream)
+        # The call spans from its opening bracket to just past its last
+        # token and closing bracket.
+        start = pos - 1
+        end = max(
+            _original_position(deletions, token.end_pos - 1) + 2
+            for token in node.scan_values(lambda v: isinstance(v, Token))
+        )
+        # Calls that recovery may have created, by deleting a token inside
+        # or right in front of them, are not reported.
+        if any(
+            deleted_start < end
+            and (deleted_end > start or not markup[deleted_end:start].strip())
+            for deleted_start, deleted_end in deleted
+        ):
+            continue
+        calls.append((str(name),) + _line_column(markup, pos))
+
+    return errors, calls
+
+
+_worker_parser = None
+
+
+def _init_worker(grammar):
+    global _worker_parser
+    _worker_parser = Lark(grammar, parser='lalr')
+
+
+def _check_chunk(items, parser=None):
+    if parser is None:
+        parser = _worker_parser
+
+    return [(name,) + check_markup(parser, markup) for name, markup in items]
+
+
+def _find_cycles(graph):
+    # Tarjan's strongly connected components, without recursion.
+    index = dict()
+    lowlink = dict()
+    on_stack = set()
+    stack = []
+    components = []
+    for root in sorted(graph):
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph[root])))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(sorted(graph[successor]))))
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in graph[node]:
+                        components.append(component)
+
+    return [_shortest_cycle(graph, component) for component in components]
+
+
+def _shortest_cycle(graph, component):
+    start = min(component)
+    paths = {start: [start]}
+    queue = [start]
+    for node in queue:
+        for successor in sorted(graph[node]):
+            if successor == start:
+                return paths[node] + [start]
+            if successor in component and successor not in paths:
+                paths[successor] = paths[node] + [successor]
+                queue.append(successor)
+
+
+def validate_tags(renderer, tag_names, jobs=1):
+    items = [(name, renderer.get_tag(name)) for name in tag_names]
+    if jobs > 1 and len(items) > 1:
+        chunk_size = max(1, -(-len(items) // (jobs * 4)))
+        chunks = [
+            items[i:i + chunk_size]
+            for i in range(0, len(items), chunk_size)
+        ]
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(renderer.get_grammar(),)
+        ) as executor:
+            results = [
+                result
+                for chunk_results in executor.map(_check_chunk, chunks)
+                for result in chunk_results
+            ]
+    else:
+        results = _check_chunk(items, renderer.get_parser())
+
+    problems = []
+    graph = dict()
+    call_sites = dict()
+    known = {name for name, _ in items}
+    for name, errors, calls in results:
+        for line, column, token in errors:
+            problems.append(Problem(
+                'syntax',
+                name,
+                f'unexpected {token}',
+                line,
+                column
+            ))
+        graph[name] = set()
+        for callee, line, column in calls or ():
+            if callee in known:
+                graph[name].add(callee)
+                call_sites.setdefault((name, callee), (line, column))
+            elif not renderer.has_tag(callee):
+                problems.append(Problem(
+                    'missing_tag',
+                    name,
+                    f'tag {callee} not found',
+                    line,
+                    column
+                ))
+
+    for cycle in _find_cycles(graph):
+        line, column = call_sites[(cycle[0], cycle[1])]
+        problems.append(Problem(
+            'cycle',
+            cycle[0],
+            'dependency cycle ' + ' -> '.join(cycle),
+            line,
+            column
+        ))
+
+    return ValidationReport(len(items), problems)
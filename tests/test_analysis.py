@@ -0,0 +1,74 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from tagup import BaseRenderer, TagDictMixin
+
+
+class ArgumentUsageTestCase(TestCase):
+    class TestRenderer(TagDictMixin, BaseRenderer):
+        pass
+
+    tags = {
+        'page': '<main>[header title\\\\[\\\\1]][\\\\2][nav]</main>',
+        'header': '<h1>[\\\\title]</h1>[\\if subtitle\\[\\\\subtitle]]',
+        'nav': '<nav>[\\\\site][link [\\\\href]\\\\x]</nav>',
+        'link': '<a>[\\\\href]</a>',
+        'list': '[\\loop <li>[\\item]</li>]',
+        'tree': '[\\if 1\\[tree [\\\\depth]]][missing]',
+    }
+
+    def setUp(self):
+        self.renderer = self.TestRenderer(self.tags)
+        self.renderer.evaluate_ast = MagicMock(
+            side_effect=AssertionError('analysis evaluated markup')
+        )
+        self.usages = self.renderer.analyze_tags()
+
+    def test_direct(self):
+        header = self.usages['header']
+        self.assertEqual(header.named, {'title', 'subtitle'})
+        self.assertEqual(header.positional, set())
+        self.assertFalse(header.loop)
+        page = self.usages['page']
+        self.assertEqual(page.named, set())
+        self.assertEqual(page.positional, {0, 1})
+        self.assertTrue(self.usages['list'].loop)
+
+    def test_propagated(self):
+        page = self.usages['page']
+        with self.subTest('reachable tags'):
+            self.assertEqual(page.tags, {'header', 'nav', 'link'})
+            self.assertEqual(page.missing_tags, set())
+        with self.subTest('globals'):
+            # title is passed by page, but subtitle falls back to globals,
+            # and a dynamically named argument never shadows one.
+            self.assertEqual(page.globals, {'subtitle', 'site', 'href'})
+            self.assertEqual(self.usages['nav'].globals, {'href'})
+            self.assertEqual(self.usages['link'].globals, set())
+
+    def test_recursive(self):
+        tree = self.usages['tree']
+        self.assertEqual(tree.tags, {'tree', 'missing'})
+        self.assertEqual(tree.missing_tags, {'missing'})
+        self.assertEqual(tree.globals, {'depth'})
+        self.assertIsNone(self.usages['missing'])
+
+    def test_subset(self):
+        usages = self.renderer.analyze_tags(['nav'])
+        self.assertEqual(set(usages), {'nav', 'link'})
+
+    def test_markup(self):
+        usage = self.renderer.analyze_markup(
+            '[page [\\\\heading]\\[\\\\3]][\\loop [\\item]]'
+        )
+        self.assertEqual(usage.named, {'heading'})
+        self.assertEqual(usage.positional, {2})
+        self.assertTrue(usage.loop)
+        self.assertEqual(usage.tags, {'page', 'header', 'nav', 'link'})
+        self.assertEqual(usage.globals, {'subtitle', 'site', 'href'})
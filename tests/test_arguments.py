@@ -0,0 +1,94 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from itertools import count
+from unittest import TestCase
+
+from tagup.arguments import ArgumentScope, LazyPositionalArguments
+from tagup.exceptions import PositionalArgumentDiscarded
+
+
+class LazyPositionalArgumentsTestCase(TestCase):
+    def test_getitem(self):
+        fetched = []
+
+        def generate():
+            for i in count():
+                fetched.append(i)
+                yield str(i)
+
+        args = LazyPositionalArguments(generate())
+        self.assertEqual(args[2], '2')
+        self.assertEqual(fetched, [0, 1, 2])
+        self.assertEqual(args[0], '0')
+        self.assertEqual(fetched, [0, 1, 2])
+
+    def test_index_error(self):
+        args = LazyPositionalArguments(iter(['a', 'b']))
+        with self.assertRaises(IndexError):
+            args[2]
+        with self.assertRaises(IndexError):
+            args[-1]
+        self.assertEqual(args[1], 'b')
+
+    def test_iter(self):
+        args = LazyPositionalArguments(iter(['a', 'b', 'c']))
+        self.assertEqual(args[0], 'a')
+        self.assertEqual(list(args), ['a', 'b', 'c'])
+        self.assertEqual(list(args), ['a', 'b', 'c'])
+
+    def test_bounded_buffer(self):
+        args = LazyPositionalArguments(iter('abcde'), buffer_size=2)
+        self.assertEqual(list(args), ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(args[1], 'b')
+        with self.assertRaises(PositionalArgumentDiscarded):
+            args[3]
+        with self.assertRaises(IndexError):
+            args[5]
+        with self.assertRaises(PositionalArgumentDiscarded):
+            list(args)
+
+    def test_bounded_getitem(self):
+        args = LazyPositionalArguments(iter(range(100)), buffer_size=2)
+        self.assertEqual(args[50], 50)
+        self.assertEqual(len(args._buffer), 2)
+        self.assertEqual(args[1], 1)
+        with self.assertRaises(PositionalArgumentDiscarded):
+            args[49]
+
+    def test_retain(self):
+        args = LazyPositionalArguments(iter('abcde'), buffer_size=2)
+        args.retain()
+        outer = []
+        for item in args:
+            outer.append(item + ''.join(args))
+        self.assertEqual(outer, [item + 'abcde' for item in 'abcde'])
+
+
+class ArgumentScopeTestCase(TestCase):
+    def setUp(self):
+        self.parent = {'a': 'parent a', 'b': 'parent b'}
+        self.scope = ArgumentScope(
+            {'a': 'layer a', 'c': 'layer c'},
+            self.parent
+        )
+
+    def test_getitem(self):
+        self.assertEqual(self.scope['a'], 'layer a')
+        self.assertEqual(self.scope['b'], 'parent b')
+        self.assertEqual(self.scope['c'], 'layer c')
+        with self.assertRaises(KeyError):
+            self.scope['d']
+
+    def test_contains(self):
+        self.assertIn('a', self.scope)
+        self.assertIn('b', self.scope)
+        self.assertIn('c', self.scope)
+        self.assertNotIn('d', self.scope)
+
+    def test_parent_changes_visible(self):
+        self.parent['d'] = 'parent d'
+        self.assertEqual(self.scope['d'], 'parent d')
@@ -0,0 +1,109 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from tagup import AutoescapeMixin, BaseRenderer, TagDictMixin, TrimMixin
+
+
+class RenderBatchTestCase(TestCase):
+    class TestRenderer(TagDictMixin, BaseRenderer):
+        pass
+
+    tags = {
+        'header': '<h1>[\\\\1]</h1>',
+        'greeting': 'Dear [\\\\1],',
+        'item': '<li>[\\\\1]</li>',
+        'footer': '<footer>[\\\\company]</footer>',
+    }
+    markup = (
+        '[header Newsletter]\n'
+        '[\\if name\\[greeting [\\\\name]]\\Hello,]\n'
+        '[\\if vip\\You are a VIP.]\n'
+        '<ul>[\\loop [item [\\item]]\\<li>nothing</li>]</ul>\n'
+        '[\\if 2\\Second: [\\\\2]]\n'
+        '[footer]'
+    )
+    arg_sets = [
+        ({'name': 'Ann'}, ['a', 'b']),
+        ({'name': 'Bob', 'vip': ''}, ['c']),
+        ({}, []),
+        ({'name': 'Cy'}, ['d', 'e', 'f']),
+        ({'name': '<Di>', 'vip': ''}, ['g']),
+    ]
+
+    def setUp(self):
+        self.renderer = self.TestRenderer(self.tags)
+        self.renderer.set_globals({'company': 'ACME'})
+
+    def naive(self, renderer, arg_sets):
+        return [
+            renderer.render_markup(self.markup, named_args, pos_args)
+            for named_args, pos_args in arg_sets
+        ]
+
+    def test_matches_naive_loop(self):
+        self.assertEqual(
+            self.renderer.render_batch(self.markup, self.arg_sets),
+            self.naive(self.renderer, self.arg_sets)
+        )
+
+    def test_lazy_pos_args(self):
+        self.assertEqual(
+            self.renderer.render_batch(
+                self.markup,
+                [({}, iter(['x', 'y']))]
+            ),
+            self.naive(self.renderer, [({}, ['x', 'y'])])
+        )
+
+    def test_static_fragments_rendered_once_per_group(self):
+        renderer = self.TestRenderer(self.tags, memoize_tags=False)
+        renderer.set_globals({'company': 'ACME'})
+        renderer.get_tag = MagicMock(side_effect=renderer.get_tag)
+        renderer.render_batch(
+            self.markup,
+            [({'name': str(i)}, ['a', 'b']) for i in range(50)]
+        )
+        calls = [call.args[0] for call in renderer.get_tag.call_args_list]
+        self.assertEqual(calls.count('header'), 1)
+        self.assertEqual(calls.count('footer'), 1)
+        self.assertEqual(calls.count('greeting'), 50)
+        self.assertEqual(calls.count('item'), 100)
+
+    def test_mixins(self):
+        class EscapingRenderer(AutoescapeMixin, TrimMixin, self.TestRenderer):
+            pass
+
+        renderer = EscapingRenderer(self.tags)
+        renderer.set_globals({'company': 'A&B'})
+        self.assertEqual(
+            renderer.render_batch(self.markup, self.arg_sets),
+            self.naive(renderer, self.arg_sets)
+        )
+
+    def test_constant_markup(self):
+        self.assertEqual(
+            self.renderer.render_batch('[header x]', [({}, []), ({}, [])]),
+            ['<h1>x</h1>', '<h1>x</h1>']
+        )
+
+    def test_constant_loop_body(self):
+        arg_sets = [({}, ['a', 'b']), ({}, ['c']), ({}, [])]
+        for markup in (
+            '[\\loop x]',
+            '[\\loop [header x]]',
+            '[\\loop a[\\loop b]]',
+        ):
+            with self.subTest(markup=markup):
+                self.assertEqual(
+                    self.renderer.render_batch(markup, arg_sets),
+                    [
+                        self.renderer.render_markup(markup, *args)
+                        for args in arg_sets
+                    ]
+                )
@@ -0,0 +1,116 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+import gc
+import pickle
+from unittest import TestCase
+from unittest.mock import patch
+
+from tagup.caching import LRUCacheStore, LRUDict, ParseStore
+
+
+class LRUCacheStoreTestCase(TestCase):
+    def test_get_set(self):
+        store = LRUCacheStore()
+        with self.assertRaises(KeyError):
+            store.get('a')
+        store.set('a', 1)
+        self.assertEqual(store.get('a'), 1)
+        store.delete('a')
+        with self.assertRaises(KeyError):
+            store.get('a')
+
+    def test_eviction(self):
+        store = LRUCacheStore(max_size=2)
+        store.set('a', 1)
+        store.set('b', 2)
+        store.get('a')
+        store.set('c', 3)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get('a'), 1)
+        self.assertEqual(store.get('c'), 3)
+        with self.assertRaises(KeyError):
+            store.get('b')
+
+    def test_ttl(self):
+        store = LRUCacheStore()
+        with patch('tagup.caching.monotonic', return_value=100.0):
+            store.set('a', 1, ttl=10)
+            store.set('b', 2)
+        with patch('tagup.caching.monotonic', return_value=109.0):
+            self.assertEqual(store.get('a'), 1)
+        with patch('tagup.caching.monotonic', return_value=110.0):
+            with self.assertRaises(KeyError):
+                store.get('a')
+            self.assertEqual(store.get('b'), 2)
+        self.assertEqual(len(store), 1)
+
+
+class LRUDictTestCase(TestCase):
+    def test_eviction(self):
+        entries = LRUDict(max_size=2)
+        entries['a'] = 1
+        entries['b'] = 2
+        entries['a']
+        entries['c'] = 3
+        self.assertEqual(entries, {'a': 1, 'c': 3})
+        self.assertNotIn('b', entries)
+        self.assertEqual(entries.pop('a'), 1)
+        self.assertEqual(len(entries), 1)
+
+    def test_pickle(self):
+        entries = LRUDict(max_size=2)
+        entries.update({'a': 1, 'b': 2})
+        entries.pin('c', 3)
+        copy = pickle.loads(pickle.dumps(entries))
+        self.assertEqual(copy, entries)
+        self.assertEqual(copy.max_size, 2)
+        copy.update({'d': 4, 'e': 5})
+        self.assertEqual(copy, {'c': 3, 'd': 4, 'e': 5})
+
+    def test_pin(self):
+        entries = LRUDict(max_size=1)
+        entries['a'] = 1
+        entries.pin('a', 2)
+        entries.pin('b', 3)
+        entries['c'] = 4
+        entries['d'] = 5
+        self.assertEqual(entries, {'a': 2, 'b': 3, 'd': 5})
+        self.assertEqual(len(entries), 3)
+        entries['a'] = 6
+        del entries['b']
+        self.assertEqual(entries, {'a': 6, 'd': 5})
+
+
+class ParseStoreTestCase(TestCase):
+    class Value:
+        pass
+
+    def test_get_set(self):
+        store = ParseStore()
+        value = self.Value()
+        with self.assertRaises(KeyError):
+            store.get('a')
+        self.assertIs(store.set('a', value), value)
+        self.assertIs(store.set('a', self.Value()), value)
+        self.assertIs(store.get('a'), value)
+        store.delete('a')
+        with self.assertRaises(KeyError):
+            store.get('a')
+
+    def test_weak_entries(self):
+        store = ParseStore(max_size=1)
+        held = store.set('a', self.Value())
+        store.set('b', self.Value())
+        store.set('c', self.Value())
+        gc.collect()
+        with self.subTest('recently used'):
+            store.get('c')
+        with self.subTest('held elsewhere'):
+            self.assertIs(store.get('a'), held)
+        with self.subTest('released'):
+            with self.assertRaises(KeyError):
+                store.get('b')
@@ -0,0 +1,223 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+import json
+import os
+from io import StringIO
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from tagup.cli import BatchRenderer, LibraryRenderer, main
+from tagup.recording import RenderRecorder
+
+
+class BatchRendererTestCase(TestCase):
+    tags = {
+        'bold': '<b>[\\\\1]</b>',
+        'title': '<h1>[bold [\\\\1]]</h1>',
+        'footer': '<footer>[\\\\site]</footer>',
+    }
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.source_dir = path.join(self.tmp_dir.name, 'src')
+        self.dest_dir = path.join(self.tmp_dir.name, 'out')
+        self.library_path = path.join(self.tmp_dir.name, 'tags.json')
+        self.globals_path = path.join(self.tmp_dir.name, 'globals.json')
+        self.write_json(self.library_path, self.tags)
+        self.write_json(self.globals_path, {'site': 'example'})
+        self.write_source('index.tagup', '[title Home]')
+        self.write_source('docs/about.tagup', 'About [footer]')
+        self.write_source('docs/notes.txt', 'ignored')
+
+    def write_json(self, filepath, value, mtime=None):
+        with open(filepath, 'w') as f_out:
+            json.dump(value, f_out)
+        if mtime is not None:
+            os.utime(filepath, ns=(mtime, mtime))
+
+    def write_source(self, relpath, markup, mtime=None):
+        filepath = path.join(self.source_dir, relpath)
+        os.makedirs(path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'w') as f_out:
+            f_out.write(markup)
+        if mtime is not None:
+            os.utime(filepath, ns=(mtime, mtime))
+
+    def read_output(self, relpath):
+        with open(path.join(self.dest_dir, relpath)) as f_in:
+            return f_in.read()
+
+    def get_batch(self, jobs=1):
+        return BatchRenderer(
+            self.source_dir,
+            self.dest_dir,
+            self.library_path,
+            globals_path=self.globals_path,
+            jobs=jobs,
+        )
+
+    def test_render_all(self):
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                stats = self.get_batch(jobs).render_all()
+                self.assertEqual(len(stats.results), 2)
+                self.assertEqual(stats.failures, [])
+                self.assertEqual(
+                    self.read_output('index.html'),
+                    '<h1><b>Home</b></h1>'
+                )
+                self.assertEqual(
+                    self.read_output('docs/about.html'),
+                    'About <footer>example</footer>'
+                )
+                self.assertIn('rendered 2 files (0 failed)', str(stats))
+
+    def test_render_failure(self):
+        self.write_source('broken.tagup', '[missing]')
+        stats = self.get_batch().render_all()
+        self.assertEqual(len(stats.failures), 1)
+        self.assertIn('TagNotFound', stats.failures[0].error)
+        self.assertIn('broken.tagup', str(stats))
+
+    def test_source_removed(self):
+        batch = self.get_batch()
+        removed = path.join(self.source_dir, 'removed.tagup')
+        stats = batch.render([removed])
+        self.assertEqual(len(stats.failures), 1)
+        self.assertIn('FileNotFoundError', stats.failures[0].error)
+        self.assertIn('removed.tagup', str(stats))
+
+    def test_watch_library_error(self):
+        batch = self.get_batch()
+        with open(self.library_path, 'w') as f_out:
+            f_out.write('{"bold": ')
+        os.utime(self.library_path, ns=(1, 1))
+        stream = StringIO()
+        batch.watch(interval=0, stream=stream, max_cycles=2)
+        self.assertEqual(
+            stream.getvalue().count(
+                'failed to load tag library: JSONDecodeError'
+            ),
+            2
+        )
+        self.assertEqual(batch.tags, self.tags)
+        with self.subTest('recovered'):
+            self.write_json(
+                self.library_path,
+                {**self.tags, 'bold': '<strong>[\\\\1]</strong>'},
+                mtime=2
+            )
+            self.assertEqual(
+                batch.poll(),
+                {path.join(self.source_dir, 'index.tagup')}
+            )
+
+    def test_poll(self):
+        batch = self.get_batch()
+        batch.render_all()
+        with self.subTest('unchanged'):
+            self.assertEqual(batch.poll(), set())
+        with self.subTest('source changed'):
+            self.write_source('index.tagup', '[title Start]', mtime=1)
+            self.assertEqual(
+                batch.poll(),
+                {path.join(self.source_dir, 'index.tagup')}
+            )
+        with self.subTest('tag dependency changed'):
+            self.write_json(
+                self.library_path,
+                {**self.tags, 'bold': '<strong>[\\\\1]</strong>'},
+                mtime=1
+            )
+            self.assertEqual(
+                batch.poll(),
+                {path.join(self.source_dir, 'index.tagup')}
+            )
+        with self.subTest('source removed'):
+            os.remove(path.join(self.source_dir, 'docs/about.tagup'))
+            self.assertEqual(batch.poll(), set())
+            self.assertFalse(
+                path.exists(path.join(self.dest_dir, 'docs/about.html'))
+            )
+
+    def test_main(self):
+        with patch('sys.stderr', new_callable=StringIO) as stderr:
+            status = main([
+                'render',
+                self.source_dir,
+                self.dest_dir,
+                '--tags', self.library_path,
+                '--globals', self.globals_path,
+                '--jobs', '1',
+            ])
+        self.assertEqual(status, 0)
+        self.assertIn('throughput', stderr.getvalue())
+        self.assertEqual(
+            self.read_output('index.html'),
+            '<h1><b>Home</b></h1>'
+        )
+
+    def test_validate(self):
+        with self.subTest('valid'):
+            with patch('sys.stdout', new_callable=StringIO) as stdout:
+                status = main(['validate', '--tags', self.library_path])
+            self.assertEqual(status, 0)
+            self.assertEqual(
+                json.loads(stdout.getvalue()),
+                {'tags': 3, 'problems': []}
+            )
+        with self.subTest('invalid'):
+            self.write_json(self.library_path, {'bold': '<b>[missing</b>'})
+            with patch('sys.stdout', new_callable=StringIO) as stdout:
+                status = main([
+                    'validate',
+                    '--tags', self.library_path,
+                    '--jobs', '1',
+                ])
+            self.assertEqual(status, 1)
+            self.assertEqual(
+                [p['kind'] for p in json.loads(stdout.getvalue())['problems']],
+                ['syntax']
+            )
+
+    def test_replay(self):
+        recording_path = path.join(self.tmp_dir.name, 'renders.jsonl')
+        recorder = RenderRecorder(recording_path)
+        renderer = LibraryRenderer(self.tags, recorder=recorder)
+        renderer.render_markup('[title Home]')
+        renderer.render_markup('[bold [\\\\1]]', {}, ['x'])
+        recorder.close()
+        with self.subTest('unchanged'):
+            with patch('sys.stderr', new_callable=StringIO) as stderr:
+                status = main([
+                    'replay',
+                    recording_path,
+                    '--tags', self.library_path,
+                    '--repeat', '3',
+                ])
+            self.assertEqual(status, 0)
+            self.assertIn('replayed 6 renders', stderr.getvalue())
+            self.assertIn('latency: p50', stderr.getvalue())
+        with self.subTest('changed'):
+            self.write_json(
+                self.library_path,
+                {**self.tags, 'bold': '<strong>[\\\\1]</strong>'}
+            )
+            with patch('sys.stderr', new_callable=StringIO) as stderr:
+                status = main([
+                    'replay',
+                    recording_path,
+                    '--tags', self.library_path,
+                ])
+            self.assertEqual(status, 1)
+            self.assertIn(
+                'differences: 2 (2 records use changed tags)',
+                stderr.getvalue()
+            )
@@ -0,0 +1,143 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from tagup import BaseRenderer, CacheMixin, TagDictMixin
+from tagup.caching import ParseStore
+
+
+class ExplainTestCase(TestCase):
+    class TestRenderer(CacheMixin, TagDictMixin, BaseRenderer):
+        cache_policies = {
+            'link': (None, None),
+        }
+
+    tags = {
+        'page': (
+            '<ul>[\\loop [item [\\item]][\\loop .]]</ul>'
+            '[\\if title\\[header]][link home]'
+        ),
+        'item': '<li>[link [\\\\1]]</li>',
+        'link': '<a>[\\\\1]</a>',
+        'header': '<h1>[\\\\title]</h1>',
+        'recursive': '[recursive]',
+        'broken': '[link',
+        'lost': '[nowhere]',
+    }
+
+    def setUp(self):
+        self.renderer = self.TestRenderer(
+            self.tags,
+            parse_store=ParseStore()
+        )
+
+    def test_plan(self):
+        plan = self.renderer.explain('[page\\a\\b]')
+        page, = plan.children
+        self.assertEqual((page.name, page.line, page.column), ('page', 1, 2))
+        self.assertEqual(page.depth, 1)
+        # The outer loop runs twice and the nested loop twice per item.
+        self.assertEqual(page.loop_expansions, 6)
+        item, link = page.children
+        self.assertEqual((item.name, item.calls), ('item', 2))
+        self.assertEqual((link.name, link.calls), ('link', 1))
+        self.assertEqual(item.children[0].name, 'link')
+        self.assertEqual(plan.total_tag_calls, 6)
+        self.assertEqual(plan.max_depth, 3)
+        self.assertEqual(
+            plan.total_nodes,
+            plan.nodes + page.nodes + 2 * (item.nodes + link.nodes)
+            + link.nodes
+        )
+
+    def test_control_flow(self):
+        plan = self.renderer.explain('[page\\title\\\\x]')
+        names = [child.name for child in plan.children[0].children]
+        self.assertEqual(names, ['header', 'link'])
+        self.assertEqual(plan.children[0].loop_expansions, 0)
+
+    def test_globals(self):
+        self.renderer.set_globals({'title': 'x'})
+        plan = self.renderer.explain('[page]')
+        names = [child.name for child in plan.children[0].children]
+        self.assertEqual(names, ['header', 'link'])
+
+    def test_root_arguments(self):
+        plan = self.renderer.explain('[\\loop [link [\\item]]]', {}, 'abc')
+        self.assertEqual(plan.loop_expansions, 3)
+        self.assertEqual(plan.children[0].calls, 3)
+
+    def test_parse_status(self):
+        plan = self.renderer.explain('[page\\a]')
+        self.assertEqual(plan.parse, 'parse')
+        self.assertEqual(plan.children[0].parse, 'parse')
+        self.renderer.render_markup('[page\\a]')
+        plan = self.renderer.explain('[page\\a]')
+        self.assertEqual(plan.parse, 'parse')
+        self.assertEqual(plan.children[0].parse, 'memory')
+
+    def test_cache_status(self):
+        plan = self.renderer.explain('[page\\a]')
+        item, link = plan.children[0].children
+        self.assertIsNone(item.cache)
+        # Arguments that depend on the render cannot be keyed in advance.
+        self.assertEqual(item.children[0].cache, 'unknown')
+        self.assertEqual(link.cache, 'miss')
+        self.renderer.render_markup('[page\\a]')
+        plan = self.renderer.explain('[page\\a]')
+        self.assertEqual(plan.children[0].children[1].cache, 'hit')
+        plan = self.renderer.explain('[link\\cache-key\\\\k]')
+        self.assertEqual(plan.children[0].cache, 'miss')
+
+    def test_problems(self):
+        with self.subTest('missing tag'):
+            plan = self.renderer.explain('[lost]')
+            self.assertTrue(plan.children[0].children[0].missing)
+        with self.subTest('syntax error'):
+            plan = self.renderer.explain('[broken]')
+            self.assertIn('END', plan.children[0].error)
+        with self.subTest('invalid cache policy'):
+            plan = self.renderer.explain(
+                '[link x\\cache-key\\\\k\\cache-ttl\\\\soon]'
+            )
+            self.assertEqual(
+                plan.children[0].error,
+                "invalid cache-ttl 'soon': ROOT -> link"
+            )
+        with self.subTest('stack overflow'):
+            plan = self.renderer.explain('[recursive]')
+            self.assertEqual(plan.max_depth, 9)
+            node = plan
+            while node.children:
+                node = node.children[0]
+            self.assertTrue(node.overflow)
+            self.assertEqual(node.depth, 9)
+
+    def test_does_not_render(self):
+        self.renderer.evaluate_ast = MagicMock(
+            side_effect=AssertionError('explain rendered markup')
+        )
+        self.renderer.explain('[page\\title\\\\x\\a\\b]')
+
+    def test_output(self):
+        plan = self.renderer.explain('[page\\a\\b]')
+        data = plan.as_dict()
+        self.assertEqual(data['name'], 'ROOT')
+        self.assertEqual(data['children'][0]['loop_expansions'], 6)
+        self.assertEqual(data['children'][0]['children'][0]['calls'], 2)
+        self.assertEqual(
+            str(plan).splitlines(),
+            [
+                'ROOT (parse: parse, nodes: 9)',
+                '  page:1,2 (parse: parse, nodes: 31, loop expansions: 6)',
+                '    item:1,13 x2 (parse: parse, nodes: 9)',
+                '      link:1,6 (parse: parse, cache: unknown, nodes: 5)',
+                '    link:1,62 (parse: shared, cache: miss, nodes: 5)',
+                'total: 6 tag calls, 73 nodes, 6 loop expansions, depth 3',
+            ]
+        )
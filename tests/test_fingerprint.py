@@ -0,0 +1,134 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from tagup import BaseRenderer, TagDictMixin
+
+
+class FingerprintTestCase(TestCase):
+    class TestRenderer(TagDictMixin, BaseRenderer):
+        pass
+
+    tags = {
+        'page': '<main>[header][\\\\1]</main>',
+        'header': '<h1>[\\\\site]</h1>',
+        'list': '[\\loop <li>[\\item]</li>]',
+        'unused': '[\\\\other-global]',
+    }
+    markup = '[page [\\\\title]] [\\if 2\\[\\\\2]]'
+
+    def setUp(self):
+        self.renderer = self.TestRenderer(self.tags)
+        self.renderer.set_globals({'site': 'Example', 'other-global': 'x'})
+        self.renderer.evaluate_ast = MagicMock(
+            side_effect=AssertionError('fingerprint evaluated markup')
+        )
+        self.base = self.renderer.fingerprint(
+            self.markup,
+            {'title': 'Home', 'unused': 'a'},
+            ['1', '2', '3']
+        )
+
+    def fingerprint(self, named_args=None, pos_args=None, markup=None):
+        return self.renderer.fingerprint(
+            self.markup if markup is None else markup,
+            {'title': 'Home', 'unused': 'a'} if named_args is None
+            else named_args,
+            ['1', '2', '3'] if pos_args is None else pos_args
+        )
+
+    def test_stable(self):
+        self.assertEqual(self.fingerprint(), self.base)
+        other = self.TestRenderer(self.tags)
+        other.set_globals({'site': 'Example', 'other-global': 'y'})
+        self.assertEqual(
+            other.fingerprint(
+                self.markup,
+                {'title': 'Home'},
+                ['0', '2']
+            ),
+            self.base
+        )
+
+    def test_markup(self):
+        self.assertNotEqual(self.fingerprint(markup='[page]'), self.base)
+
+    def test_named_args(self):
+        with self.subTest('read'):
+            self.assertNotEqual(
+                self.fingerprint(named_args={'title': 'About'}),
+                self.base
+            )
+        with self.subTest('missing'):
+            self.assertNotEqual(self.fingerprint(named_args={}), self.base)
+        with self.subTest('unread'):
+            self.assertEqual(
+                self.fingerprint(named_args={'title': 'Home', 'unused': 'b'}),
+                self.base
+            )
+        with self.subTest('provided'):
+            self.assertEqual(
+                self.fingerprint(named_args={'title': lambda: 'Home'}),
+                self.base
+            )
+
+    def test_pos_args(self):
+        with self.subTest('read'):
+            self.assertNotEqual(
+                self.fingerprint(pos_args=['1', 'two']),
+                self.base
+            )
+        with self.subTest('missing'):
+            self.assertNotEqual(self.fingerprint(pos_args=['1']), self.base)
+        with self.subTest('unread'):
+            self.assertEqual(self.fingerprint(pos_args=['x', '2']), self.base)
+        with self.subTest('loop'):
+            self.assertNotEqual(
+                self.fingerprint(markup='[list [\\\\1]]', pos_args=['a']),
+                self.fingerprint(markup='[list [\\\\1]]', pos_args=['b'])
+            )
+            self.assertNotEqual(
+                self.fingerprint(markup='[\\loop [\\item]]', pos_args=['a']),
+                self.fingerprint(markup='[\\loop [\\item]]', pos_args=['b'])
+            )
+
+    def test_globals(self):
+        self.renderer.set_globals({'site': 'Other', 'other-global': 'x'})
+        self.assertNotEqual(self.fingerprint(), self.base)
+        self.renderer.set_globals({'site': 'Example', 'other-global': 'y'})
+        self.assertEqual(self.fingerprint(), self.base)
+        with self.subTest('passed at call site'):
+            markup = '[header site\\\\Local]'
+            before = self.fingerprint(markup=markup)
+            self.renderer.set_globals({'site': 'Other'})
+            self.assertEqual(self.fingerprint(markup=markup), before)
+
+    def test_tag_versions(self):
+        with self.subTest('reachable'):
+            self.renderer['header'] = '<h2>[\\\\site]</h2>'
+            self.assertNotEqual(self.fingerprint(), self.base)
+            self.renderer['header'] = self.tags['header']
+        with self.subTest('unreachable'):
+            self.renderer['unused'] = 'changed'
+            self.assertEqual(self.fingerprint(), self.base)
+        with self.subTest('missing'):
+            del self.renderer['header']
+            self.assertNotEqual(self.fingerprint(), self.base)
+        with self.subTest('custom version'):
+            self.renderer.get_tag_version = lambda name, markup: 1
+            self.renderer['header'] = self.tags['header']
+            before = self.fingerprint()
+            self.renderer['header'] = '<h2>[\\\\site]</h2>'
+            self.assertEqual(self.fingerprint(), before)
+
+    def test_bounded(self):
+        renderer = self.TestRenderer(self.tags, max_tag_asts=8)
+        for index in range(100):
+            renderer.fingerprint(f'[page {index}]')
+        self.assertLessEqual(len(renderer.references), 8)
+        self.assertIn('[page 99]', renderer.references)
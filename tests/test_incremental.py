@@ -0,0 +1,196 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from random import Random
+from unittest import TestCase
+from unittest.mock import patch
+
+from lark import Tree
+
+from tagup import BaseRenderer
+from tagup.exceptions import TagupSyntaxError
+
+
+def dump(node):
+    if isinstance(node, Tree):
+        meta = node.meta
+        return (
+            node.data,
+            (
+                meta.start_pos,
+                meta.end_pos,
+                meta.line,
+                meta.column,
+                meta.end_line,
+                meta.end_column,
+            ),
+            [dump(child) for child in node.children],
+        )
+    else:
+        return (
+            node.type,
+            str(node),
+            (
+                node.pos_in_stream,
+                node.end_pos,
+                node.line,
+                node.column,
+                node.end_line,
+                node.end_column,
+            ),
+        )
+
+
+class IncrementalParseTestCase(TestCase):
+    class TestRenderer(BaseRenderer):
+        tags = {
+            'bold': '<b>[\\\\1]</b>',
+        }
+
+        def get_tag(self, name):
+            return self.tags[name]
+
+    markup = (
+        'Intro text [bold first]\n'
+        '[\\if name\\Hello [\\\\name]!\\Hi]\n'
+        '\n'
+        '  [bold second\\[\\\\1]] tail [\\o]\n'
+        '[\\loop <li>[\\item]</li>]\n'
+        'outro'
+    )
+
+    def setUp(self):
+        self.renderer = self.TestRenderer()
+        self.ast = self.renderer.parse_markup(
+            self.markup,
+            track_positions=True
+        )
+
+    def assertMatchesFullParse(self, offset, removed, inserted):
+        markup, ast = self.renderer.reparse_markup(
+            self.markup,
+            self.renderer.parse_markup(self.markup, track_positions=True),
+            offset,
+            removed,
+            inserted
+        )
+        expected_markup = (
+            self.markup[:offset] + inserted + self.markup[offset + removed:]
+        )
+        self.assertEqual(markup, expected_markup)
+        expected = self.renderer.parse_markup(markup, track_positions=True)
+        self.assertEqual(dump(ast), dump(expected))
+
+        return ast
+
+    def test_edits(self):
+        edits = {
+            'insert word': (5, 0, 'more '),
+            'delete word': (0, 6, ''),
+            'insert newline': (11, 0, '\n\n'),
+            'edit tag argument': (17, 5, 'uno'),
+            'insert tag': (24, 0, '[bold new]'),
+            'remove tag': (11, 12, ''),
+            'join text': (10, 13, ''),
+            'append': (len(self.markup), 0, ' [bold end]'),
+            'prepend': (0, 0, '[bold start]\n'),
+            'replace all': (0, len(self.markup), 'plain'),
+        }
+        for label, edit in edits.items():
+            with self.subTest(label):
+                self.assertMatchesFullParse(*edit)
+
+    def test_random_edits(self):
+        rng = Random(1234)
+        alphabet = 'ab \n[]\\'
+        for _ in range(300):
+            offset = rng.randrange(len(self.markup) + 1)
+            removed = rng.randrange(min(6, len(self.markup) - offset) + 1)
+            inserted = ''.join(
+                rng.choice(alphabet)
+                for _ in range(rng.randrange(4))
+            )
+            try:
+                self.renderer.parse_markup(
+                    self.markup[:offset]
+                    + inserted
+                    + self.markup[offset + removed:]
+                )
+            except Exception:
+                continue
+            with self.subTest(edit=(offset, removed, inserted)):
+                self.assertMatchesFullParse(offset, removed, inserted)
+
+    def test_reuses_unaffected_children(self):
+        _, ast = self.renderer.reparse_markup(
+            self.markup,
+            self.ast,
+            len(self.markup) - 5,
+            5,
+            'End'
+        )
+        self.assertIs(ast.children[0], self.ast.children[0])
+        markup, ast = self.renderer.reparse_markup(
+            self.markup,
+            self.ast,
+            0,
+            5,
+            'Start'
+        )
+        # Children that do not move are shared, even after the edit.
+        self.assertIs(ast.children[-1], self.ast.children[-1])
+        with patch.object(
+            self.renderer.get_positional_parser(),
+            'parse',
+            wraps=self.renderer.get_positional_parser().parse
+        ) as parse:
+            self.renderer.reparse_markup(markup, ast, 0, 5, 'Intro')
+        self.assertEqual(
+            len(parse.call_args.args[0]),
+            len('Intro text [bold first]')
+        )
+
+    def test_input_unchanged(self):
+        before = dump(self.ast)
+        for offset, removed, inserted in (
+            (0, 5, 'A\nlonger start'),
+            (30, 0, 'x'),
+            (len(self.markup), 0, '\n[bold end]'),
+        ):
+            with self.subTest(edit=(offset, removed, inserted)):
+                markup, ast = self.renderer.reparse_markup(
+                    self.markup,
+                    self.ast,
+                    offset,
+                    removed,
+                    inserted
+                )
+                self.assertEqual(dump(self.ast), before)
+                # Every edit after the first starts from the same tree.
+                self.assertEqual(
+                    dump(ast),
+                    dump(self.renderer.parse_markup(
+                        markup,
+                        track_positions=True
+                    ))
+                )
+
+    def test_syntax_error(self):
+        with self.assertRaises(TagupSyntaxError):
+            self.renderer.reparse_markup(self.markup, self.ast, 0, 0, '[')
+
+    def test_render(self):
+        markup, ast = self.renderer.reparse_markup(
+            self.markup,
+            self.ast,
+            0,
+            len('Intro text '),
+            ''
+        )
+        self.assertEqual(
+            self.renderer.evaluate_ast(ast, {}, ['x']),
+            '<b>first</b>\nHi\n\n  <b>second</b> tail [\n<li>x</li>\noutro'
+        )
@@ -4,21 +4,42 @@ See file LICENSE for full license details.
 """
 
 
+import gc
+import os
+import subprocess
+import sys
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from os import path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+
+from lark import Token
 
 from tagup import (
+    AutoescapeMixin,
     BaseRenderer,
+    CacheMixin,
+    FileSystemTagMixin,
+    SafeString,
+    ShadowMixin,
     StaticTagMixin,
     TagDictMixin,
     TrimMixin,
 )
+from tagup.caching import ParseStore
+from tagup.evaluation import CommonEvaluator, ControlFlowEvaluator
 from tagup.exceptions import (
     ImproperlyConfigured,
     NamedArgumentMissing,
+    PositionalArgumentDiscarded,
     PositionalArgumentMissing,
+    RenderLimitExceeded,
     TagNotFound,
     TagStackOverflow,
+    TagupRenderingError,
     TagupSyntaxError,
 )
 
@@ -275,6 +296,107 @@ class RenderingTestCase(TestCase):
             )
 
 
+class LazyPositionalArgumentsTestCase(TestCase):
+    class TestRenderer(BaseRenderer):
+        tags = {
+            'row': '<tr>[\\\\1]</tr>',
+        }
+
+        def get_tag(self, name):
+            return self.tags[name]
+
+    def setUp(self):
+        self.renderer = self.TestRenderer()
+
+    def test_generator(self):
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[\\loop [row [\\item]]\\empty]',
+                pos_args=(str(i) for i in range(3))
+            ),
+            '<tr>0</tr><tr>1</tr><tr>2</tr>'
+        )
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[\\loop [row [\\item]]\\empty]',
+                pos_args=iter([])
+            ),
+            'empty'
+        )
+
+    def test_only_referenced_items_fetched(self):
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[\\if 2\\[\\\\2]] [\\if 1000000\\many\\few]',
+                pos_args=(str(i) for i in range(10))
+            ),
+            '1 few'
+        )
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[\\\\3]',
+                pos_args=(str(i) for i in count())
+            ),
+            '2'
+        )
+
+    def test_loop_streams_items(self):
+        events = []
+
+        def generate():
+            for i in range(3):
+                events.append(f'fetch {i}')
+                yield str(i)
+
+        def postprocess_tag_node(node):
+            events.append(f'render {node}')
+            return node
+
+        self.renderer.postprocess_tag_node = postprocess_tag_node
+        self.renderer.render_markup(
+            '[\\loop [row [\\item]]]',
+            pos_args=generate()
+        )
+        self.assertEqual(
+            events,
+            [
+                'fetch 0',
+                'render <tr>0</tr>',
+                'fetch 1',
+                'render <tr>1</tr>',
+                'fetch 2',
+                'render <tr>2</tr>',
+            ]
+        )
+
+    def test_repeated_loops(self):
+        self.renderer.pos_args_buffer_size = 2
+        items = [str(i) for i in range(5)]
+        for markup in (
+            '[\\loop ([\\item]:[\\loop .])]',
+            '[\\loop [\\item]] [\\loop [row [\\item]]]',
+        ):
+            with self.subTest(markup=markup):
+                self.assertEqual(
+                    self.renderer.render_markup(markup, pos_args=iter(items)),
+                    self.renderer.render_markup(markup, pos_args=items)
+                )
+
+    def test_discarded(self):
+        self.renderer.pos_args_buffer_size = 2
+        with self.assertRaises(PositionalArgumentDiscarded) as cm:
+            self.renderer.render_markup(
+                '[\\loop [\\item]][row [\\\\4]]',
+                pos_args=iter('abcde')
+            )
+        self.assertEqual(str(cm.exception.tag_stack_trace), 'ROOT -> 4')
+        self.assertEqual(
+            str(cm.exception),
+            'positional argument 4 was discarded after streaming past the '
+            '2 item buffer: ROOT -> 4'
+        )
+
+
 class TagFetchTestCase(TestCase):
     class UnimplementedFetchTestRenderer(BaseRenderer):
         pass
@@ -335,6 +457,151 @@ class TagPrefetchTestCase(TestCase):
         )
 
 
+class EvaluatorReuseTestCase(TestCase):
+    class TestRenderer(BaseRenderer):
+        tags = {
+            'inner': '<i>[\\\\1]</i>',
+            'outer': '[inner [\\\\1]][\\\\1][inner [\\\\2]][\\\\2]',
+        }
+
+        def get_tag(self, name):
+            return self.tags[name]
+
+    def test_evaluators_reused(self):
+        renderer = self.TestRenderer()
+        with patch(
+            'tagup.language.CommonEvaluator',
+            wraps=CommonEvaluator
+        ) as common, patch(
+            'tagup.language.ControlFlowEvaluator',
+            wraps=ControlFlowEvaluator
+        ) as control_flow:
+            for _ in range(2):
+                self.assertEqual(
+                    renderer.render_markup('[outer a\\b][outer c\\d]'),
+                    '<i>a</i>a<i>b</i>b<i>c</i>c<i>d</i>d'
+                )
+        self.assertEqual(common.call_count, 1)
+        self.assertEqual(control_flow.call_count, 1)
+
+
+class NonDestructiveEvaluationTestCase(TestCase):
+    class TestRenderer(StaticTagMixin, BaseRenderer):
+        tags = {
+            'bold': '<b>[\\\\1]</b>',
+            'list': '[\\loop <i>[\\item]</i>\\empty]',
+        }
+
+    markup = (
+        '[\\if title\\<h1>[\\\\title]</h1>]'
+        '[\\if 1\\<ul>[\\loop <li>[bold [\\item]]</li>]</ul>]'
+        '[\\loop ([\\loop [\\item]])]'
+        '[list x\\y]'
+    )
+
+    def test_repeated_render(self):
+        renderer = self.TestRenderer()
+        ast = renderer.parse_markup(self.markup)
+        for named_args, pos_args, expected in (
+            (
+                {'title': 'T'},
+                ['a', 'b'],
+                '<h1>T</h1><ul><li><b>a</b></li><li><b>b</b></li></ul>'
+                '(aa)(bb)<i>x</i><i>y</i>',
+            ),
+            (
+                {},
+                ['c'],
+                '<ul><li><b>c</b></li></ul>(c)<i>x</i><i>y</i>',
+            ),
+            (
+                {'title': 'U'},
+                [],
+                '<h1>U</h1><i>x</i><i>y</i>',
+            ),
+        ):
+            with self.subTest(named_args=named_args, pos_args=pos_args):
+                self.assertEqual(
+                    renderer.evaluate_ast(ast, named_args, pos_args),
+                    expected
+                )
+                self.assertEqual(ast, renderer.parse_markup(self.markup))
+        for markup, tag_ast in renderer.tag_asts.items():
+            self.assertEqual(tag_ast, renderer.parse_markup(markup))
+
+    def test_concurrent_render(self):
+        renderer = self.TestRenderer()
+        ast = renderer.parse_markup(self.markup)
+        renderer.warm(freeze=False)
+
+        def render(index):
+            # Renderers are not thread-safe, but parsed trees are shared.
+            thread_renderer = self.TestRenderer()
+            thread_renderer.tag_asts = renderer.tag_asts
+            pos_args = [str(index), str(index + 1)]
+            return thread_renderer.evaluate_ast(ast, {}, pos_args)
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(render, range(100)))
+        for index, result in enumerate(results):
+            a, b = index, index + 1
+            self.assertEqual(
+                result,
+                f'<ul><li><b>{a}</b></li><li><b>{b}</b></li></ul>'
+                f'({a}{a})({b}{b})<i>x</i><i>y</i>'
+            )
+        self.assertEqual(ast, renderer.parse_markup(self.markup))
+
+
+class ParseStoreTestCase(TestCase):
+    class TestRenderer(StaticTagMixin, BaseRenderer):
+        tags = {
+            'bold': '<b>[\\\\1]</b>',
+        }
+
+    class GrammarTestRenderer(TestRenderer):
+        grammar = BaseRenderer().get_grammar() + '\n'
+
+    def test_shared_across_renderers(self):
+        store = ParseStore()
+        renderers = [self.TestRenderer(parse_store=store) for _ in range(3)]
+        asts = [
+            renderer.parse_tag_markup('<b>[\\\\1]</b>')
+            for renderer in renderers
+        ]
+        self.assertIs(asts[0], asts[1])
+        self.assertIs(asts[0], asts[2])
+        self.assertEqual(len(store), 1)
+        with self.subTest('parser not built on hit'):
+            self.assertFalse(hasattr(renderers[1], 'parser'))
+        with self.subTest('rendered from shared tree'):
+            self.assertEqual(
+                renderers[2].render_markup('[bold a]'),
+                '<b>a</b>'
+            )
+
+    def test_keyed_by_grammar(self):
+        store = ParseStore()
+        ast = self.TestRenderer(parse_store=store).parse_shared_markup('a')
+        other = self.GrammarTestRenderer(
+            parse_store=store
+        ).parse_shared_markup('a')
+        self.assertIsNot(ast, other)
+        self.assertEqual(len(store), 2)
+
+    def test_documents_not_shared(self):
+        store = ParseStore()
+        renderer = self.TestRenderer(parse_store=store)
+        ast = renderer.parse_markup('a', track_positions=True)
+        self.assertIsNot(ast, renderer.parse_markup('a', track_positions=True))
+        self.assertIsNot(
+            renderer.parse_markup('a'),
+            renderer.parse_markup('a')
+        )
+        self.assertEqual(renderer.render_markup('[bold a]'), '<b>a</b>')
+        self.assertEqual(len(store), 1)
+
+
 class HookTestCase(TestCase):
     class PreprocessTestRenderer(BaseRenderer):
         def preprocess_block_node(self, node):
@@ -421,6 +688,159 @@ class OverflowTestCase(TestCase):
             )
 
 
+class BudgetTestCase(TestCase):
+    class TestRenderer(BaseRenderer):
+        tags = {
+            'const': 'constant value',
+            'repeat': '[\\loop [\\item][\\item]]',
+            'row': '<tr>[\\loop [const]]</tr>',
+            'x': 'x',
+        }
+
+        def get_tag(self, name):
+            return self.tags[name]
+
+    def test_unlimited(self):
+        renderer = self.TestRenderer()
+        self.assertIsNone(renderer.budget)
+        self.assertEqual(
+            renderer.render_markup('[row a\\b]'),
+            '<tr>constant valueconstant value</tr>'
+        )
+
+    def test_max_nodes(self):
+        renderer = self.TestRenderer(max_nodes=10)
+        self.assertEqual(renderer.render_markup('[const]'), 'constant value')
+        with self.assertRaises(RenderLimitExceeded) as cm:
+            renderer.render_markup('[row a\\b\\c\\d\\e\\f]')
+        self.assertEqual(cm.exception.limit, 'max_nodes')
+        self.assertEqual(
+            str(cm.exception.tag_stack_trace),
+            'ROOT:1,2 -> row'
+        )
+        self.assertEqual(len(renderer.tag_stack), 0)
+
+    def test_max_output_size(self):
+        renderer = self.TestRenderer(max_output_size=8)
+        self.assertEqual(renderer.render_markup('[repeat abc]'), 'abcabc')
+        with self.assertRaises(RenderLimitExceeded) as cm:
+            renderer.render_markup('[repeat abcde]')
+        self.assertEqual(cm.exception.limit, 'max_output_size')
+
+    def test_max_output_size_arguments(self):
+        renderer = self.TestRenderer(max_output_size=1)
+        # Arguments a tag never substitutes do not reach the output.
+        for markup in (
+            '[x longname\\b]',
+            '[x name\\\\[const][repeat abc]]',
+            '[x [x [const]]]',
+        ):
+            with self.subTest(markup=markup):
+                self.assertEqual(renderer.render_markup(markup), 'x')
+
+    def test_max_output_size_trimmed(self):
+        class TrimRenderer(TrimMixin, self.TestRenderer):
+            pass
+
+        renderer = TrimRenderer(max_output_size=1)
+        self.assertEqual(renderer.render_markup('   y      '), 'y')
+        self.assertEqual(renderer.render_markup(' [x]\n\n'), 'x')
+        with self.assertRaises(RenderLimitExceeded):
+            renderer.render_markup('  yz  ')
+
+    def test_max_output_size_cumulative(self):
+        renderer = self.TestRenderer(max_output_size=100)
+        consumed = []
+
+        def items():
+            for i in range(50000):
+                consumed.append(i)
+                yield 'abc'
+
+        for markup in ('[\\loop [const]]', '[\\loop [\\item]]'):
+            with self.subTest(markup=markup):
+                consumed.clear()
+                with self.assertRaises(RenderLimitExceeded) as cm:
+                    renderer.render_markup(markup, {}, items())
+                self.assertEqual(cm.exception.limit, 'max_output_size')
+                # The loop stops as soon as the total passes the limit.
+                self.assertLess(len(consumed), 40)
+
+    def test_max_tag_calls(self):
+        renderer = self.TestRenderer(max_tag_calls=3, memoize_tags=False)
+        self.assertEqual(
+            renderer.render_markup('[const][const][const]'),
+            'constant value' * 3
+        )
+        with self.subTest('reset per render'):
+            self.assertEqual(
+                renderer.render_markup('[const][const]'),
+                'constant value' * 2
+            )
+        with self.assertRaises(RenderLimitExceeded) as cm:
+            renderer.render_markup('[row a\\b\\c]')
+        self.assertEqual(cm.exception.limit, 'max_tag_calls')
+        self.assertEqual(
+            str(cm.exception),
+            'max_tag_calls exceeded: ROOT:1,2 -> row:1,13 -> const'
+        )
+
+    def test_timeout(self):
+        renderer = self.TestRenderer(timeout=1.0)
+        clock = iter(range(0, 100, 1))
+        with patch('tagup.budget.monotonic', lambda: next(clock)):
+            with self.assertRaises(RenderLimitExceeded) as cm:
+                renderer.render_markup('[const] [const] [const]')
+        self.assertEqual(cm.exception.limit, 'timeout')
+
+
+class TagMemoTestCase(TestCase):
+    class TestRenderer(BaseRenderer):
+        tags = {
+            'icon': '<i class="[\\\\1]"></i>',
+            'row': '<tr>[icon check][\\\\1]</tr>',
+            'nested': '[icon check]',
+        }
+
+        def get_tag(self, name):
+            return self.tags[name]
+
+    def test_duplicate_calls(self):
+        renderer = self.TestRenderer()
+        renderer.get_tag = MagicMock(side_effect=renderer.get_tag)
+        self.assertEqual(
+            renderer.render_markup('[row a][row b][row a][icon check]'),
+            '<tr><i class="check"></i>a</tr>'
+            '<tr><i class="check"></i>b</tr>'
+            '<tr><i class="check"></i>a</tr>'
+            '<i class="check"></i>'
+        )
+        # row a, icon check (depth 1), row b, icon check (depth 0).
+        self.assertEqual(renderer.get_tag.call_count, 4)
+        self.assertEqual(renderer.tag_memo, {})
+
+    def test_scoped_to_render(self):
+        renderer = self.TestRenderer()
+        self.assertEqual(
+            renderer.render_markup('[icon a]'),
+            '<i class="a"></i>'
+        )
+        renderer.tags = {'icon': '<b>[\\\\1]</b>'}
+        self.assertEqual(renderer.render_markup('[icon a]'), '<b>a</b>')
+
+    def test_depth_overflow(self):
+        renderer = self.TestRenderer(max_depth=1)
+        with self.assertRaises(TagStackOverflow):
+            renderer.render_markup('[icon check][nested]')
+
+    def test_disabled(self):
+        renderer = self.TestRenderer(memoize_tags=False)
+        renderer.get_tag = MagicMock(side_effect=renderer.get_tag)
+        renderer.render_markup('[icon check][icon check]')
+        self.assertEqual(renderer.get_tag.call_count, 2)
+        self.assertIsNone(renderer.tag_memo)
+
+
 class GlobalTestCase(TestCase):
     class TestRenderer(BaseRenderer):
         tags = {
@@ -447,6 +867,75 @@ class GlobalTestCase(TestCase):
         )
 
 
+    def test_globals_not_copied(self):
+        class Globals(Mapping):
+            def __getitem__(self, key):
+                return {'global-arg': 'global value'}[key]
+
+            def __iter__(self):
+                raise AssertionError('global named arguments were copied')
+
+            def __len__(self):
+                return 1
+
+        renderer = self.TestRenderer()
+        renderer.set_globals(Globals())
+        self.assertEqual(
+            renderer.render_markup(
+                '[wrapper local-arg\\\\local value]'
+            ),
+            '<wrapper><inner>global value</inner></wrapper>local value'
+        )
+
+
+class NamedArgumentProviderTestCase(TestCase):
+    class TestRenderer(StaticTagMixin, BaseRenderer):
+        tags = {
+            'profile': '<p>[\\\\user]</p>',
+        }
+
+    def setUp(self):
+        self.renderer = self.TestRenderer()
+        self.user = MagicMock(return_value='Ann')
+        self.related = MagicMock(return_value='Related')
+
+    def test_computed_once_per_render(self):
+        self.renderer.set_globals({'user': self.user})
+        markup = '[profile][\\\\user][\\if related\\[\\\\related]]'
+        for _ in range(2):
+            self.assertEqual(
+                self.renderer.render_markup(
+                    markup,
+                    {'related': self.related}
+                ),
+                '<p>Ann</p>AnnRelated'
+            )
+        self.assertEqual(self.user.call_count, 2)
+        self.assertEqual(self.related.call_count, 2)
+
+    def test_unused(self):
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[\\if related\\yes]',
+                {'related': self.related, 'user': self.user}
+            ),
+            'yes'
+        )
+        self.related.assert_not_called()
+        self.user.assert_not_called()
+
+    def test_autoescape(self):
+        renderer = type(
+            'AutoescapeTestRenderer',
+            (AutoescapeMixin, self.TestRenderer),
+            {}
+        )()
+        self.assertEqual(
+            renderer.render_markup('[\\\\user]', {'user': lambda: '<a>'}),
+            '&lt;a&gt;'
+        )
+
+
 class TagDictMixinTestCase(TestCase):
     class TestRenderer(TagDictMixin, BaseRenderer):
         pass
@@ -566,6 +1055,114 @@ class StaticTagMixinTestCase(TestCase):
         )
 
 
+class FileSystemTagMixinTestCase(TestCase):
+    class TestRenderer(FileSystemTagMixin, BaseRenderer):
+        pass
+
+    class InvalidTestRenderer(FileSystemTagMixin, BaseRenderer):
+        pass
+
+    class MutuallyExclusiveTestRenderer(
+        FileSystemTagMixin,
+        TagDictMixin,
+        BaseRenderer,
+    ):
+        pass
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.write_tag('bold', '<b>[\\\\1]</b>', mtime=1)
+        self.write_tag('title', '<h1>[bold [\\\\1]]</h1>', mtime=1)
+        self.renderer = self.TestRenderer(
+            tag_dir=self.tmp_dir.name,
+            revalidate_interval=10
+        )
+        self.monotonic = patch(
+            'tagup.language.monotonic',
+            return_value=0.0
+        ).start()
+        self.addCleanup(patch.stopall)
+
+    def write_tag(self, name, markup, mtime):
+        filepath = path.join(self.tmp_dir.name, name + '.tagup')
+        with open(filepath, 'w') as f_out:
+            f_out.write(markup)
+        os.utime(filepath, ns=(mtime, mtime))
+
+    def test_get_tag(self):
+        with self.subTest('valid'):
+            self.assertEqual(
+                self.renderer.render_markup('[title Home]'),
+                '<h1><b>Home</b></h1>'
+            )
+        with self.subTest('bad tag'):
+            with self.assertRaises(TagNotFound):
+                self.renderer.render_markup('[bad-tag]')
+
+    def test_get_tag_names(self):
+        with open(path.join(self.tmp_dir.name, 'notes.txt'), 'w'):
+            pass
+        self.assertEqual(self.renderer.get_tag_names(), ['bold', 'title'])
+
+    def test_revalidation(self):
+        self.renderer.render_markup('[title Home]')
+        self.write_tag('bold', '<strong>[\\\\1]</strong>', mtime=2)
+        with self.subTest('within interval'):
+            self.monotonic.return_value = 9.0
+            self.assertEqual(
+                self.renderer.render_markup('[title Home]'),
+                '<h1><b>Home</b></h1>'
+            )
+        with self.subTest('after interval'):
+            self.monotonic.return_value = 10.0
+            self.assertEqual(
+                self.renderer.render_markup('[title Home]'),
+                '<h1><strong>Home</strong></h1>'
+            )
+            self.assertNotIn('<b>[\\\\1]</b>', self.renderer.tag_asts)
+
+    def test_unchanged_not_reread(self):
+        self.renderer.render_markup('[title Home]')
+        self.monotonic.return_value = 10.0
+        with patch('builtins.open') as mock_open:
+            self.assertEqual(
+                self.renderer.render_markup('[title Home]'),
+                '<h1><b>Home</b></h1>'
+            )
+        mock_open.assert_not_called()
+
+    def test_removed(self):
+        self.renderer.render_markup('[bold Home]')
+        os.remove(path.join(self.tmp_dir.name, 'bold.tagup'))
+        self.monotonic.return_value = 10.0
+        with self.assertRaises(TagNotFound):
+            self.renderer.render_markup('[bold Home]')
+        self.assertNotIn('bold', self.renderer.tag_files)
+
+    def test_prefetch_tags(self):
+        self.renderer.prefetch_tags(['bold', 'title', 'bad-tag'])
+        self.assertEqual(set(self.renderer.tag_files), {'bold', 'title'})
+        self.assertIn('<b>[\\\\1]</b>', self.renderer.tag_asts)
+
+    def test_invalid(self):
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            _ = self.InvalidTestRenderer()
+        self.assertEqual(
+            str(cm.exception),
+            'InvalidTestRenderer must define '
+            'InvalidTestRenderer.tag_dir'
+        )
+
+    def test_mutually_exclusive(self):
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            _ = self.MutuallyExclusiveTestRenderer()
+        self.assertEqual(
+            str(cm.exception),
+            'FileSystemTagMixin and TagDictMixin are mutually exclusive'
+        )
+
+
 class TrimMixinTestCase(TestCase):
     class DefaultTestRenderer(TrimMixin, BaseRenderer):
         tags = {
@@ -603,6 +1200,458 @@ class TrimMixinTestCase(TestCase):
         )
 
 
+class LexerTestCase(TestCase):
+    class TestRenderer(TrimMixin, BaseRenderer):
+        tags = {
+            'pair': '\n  <p>[\\\\1]|[\\\\2]</p>\n',
+            'attr': '<a title="[\\\\title]">[\\\\1]</a>',
+        }
+
+        def get_tag(self, name):
+            return self.tags[name]
+
+    def setUp(self):
+        self.renderer = self.TestRenderer()
+
+    def get_tokens(self, markup):
+        return [
+            (child.type, str(child))
+            for child in self.renderer.parse_markup(markup).children
+            if isinstance(child, Token)
+        ]
+
+    def test_text_runs(self):
+        self.assertEqual(
+            self.get_tokens('The quick brown fox,\n jumps over.'),
+            [('STRING', 'The quick brown fox,\n jumps over.')]
+        )
+        self.assertEqual(
+            self.get_tokens('Hello big  world [pair x y] and\nmore '),
+            [('STRING', 'Hello big  world '), ('STRING', ' and\nmore ')]
+        )
+
+    def test_whitespace_runs(self):
+        self.assertEqual(
+            self.get_tokens('[pair] \n\t[pair]'),
+            [('WS', ' \n\t')]
+        )
+        with self.assertRaises(TagupSyntaxError):
+            self.renderer.parse_markup(' \n ')
+
+    def test_trimmed_arguments(self):
+        self.assertEqual(
+            self.renderer.render_markup(
+                '  [pair\n   first line\n   second line  \\\n'
+                '  third  line \n]  '
+            ),
+            '<p>first line\n   second line|third  line</p>'
+        )
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[attr title\\\\  a long\n title \\  body text ]'
+            ),
+            '<a title="a long\n title">body text</a>'
+        )
+
+
+class CacheMixinTestCase(TestCase):
+    class TestRenderer(CacheMixin, TagDictMixin, BaseRenderer):
+        cache_policies = {
+            'footer': (None, 60),
+        }
+
+    def setUp(self):
+        self.renderer = self.TestRenderer(
+            {
+                'nav': '<nav>[\\\\1][\\\\page]</nav>',
+                'footer': '<footer>[\\\\1]</footer>',
+            },
+            memoize_tags=False
+        )
+        self.renderer.get_tag = MagicMock(side_effect=self.renderer.get_tag)
+
+    def test_call_site_key(self):
+        markup = '[nav cache-key\\\\nav\\home\\page\\\\[\\\\page]]'
+        self.assertEqual(
+            self.renderer.render_markup(markup, {'page': 'a'}),
+            '<nav>homea</nav>'
+        )
+        self.assertEqual(
+            self.renderer.render_markup(markup, {'page': 'b'}),
+            '<nav>homea</nav>'
+        )
+        self.assertEqual(self.renderer.get_tag.call_count, 1)
+
+    def test_call_site_ttl(self):
+        markup = '[nav cache-key\\\\nav\\cache-ttl\\\\5\\page\\\\x\\y]'
+        with patch('tagup.caching.monotonic', return_value=0.0):
+            self.renderer.render_markup(markup)
+        self.renderer['nav'] = 'changed'
+        with patch('tagup.caching.monotonic', return_value=4.0):
+            self.assertEqual(
+                self.renderer.render_markup(markup),
+                '<nav>yx</nav>'
+            )
+        with patch('tagup.caching.monotonic', return_value=5.0):
+            self.assertEqual(self.renderer.render_markup(markup), 'changed')
+
+    def test_invalid_call_site_ttl(self):
+        with self.assertRaises(TagupRenderingError) as cm:
+            self.renderer.render_markup(
+                '[footer a\\cache-key\\\\f\\cache-ttl\\\\soon]'
+            )
+        self.assertEqual(
+            str(cm.exception),
+            "invalid cache-ttl 'soon': ROOT -> footer"
+        )
+        self.assertEqual(str(cm.exception.tag_stack_trace), 'ROOT -> footer')
+
+    def test_definition_policy(self):
+        self.renderer.parse_tag_markup = MagicMock(
+            side_effect=self.renderer.parse_tag_markup
+        )
+        for _ in range(2):
+            self.assertEqual(
+                self.renderer.render_markup('[footer a][footer b]'),
+                '<footer>a</footer><footer>b</footer>'
+            )
+        self.assertEqual(self.renderer.parse_tag_markup.call_count, 2)
+        self.assertEqual(len(self.renderer.cache_store), 2)
+
+    def test_definition_policy_dependencies(self):
+        renderer = self.TestRenderer(
+            {
+                'footer': '<footer>[\\\\site][link]</footer>',
+                'link': '<a>[\\\\home]</a>',
+            },
+            memoize_tags=False
+        )
+        renderer.set_globals({'site': 'a', 'home': '/a', 'unused': 'x'})
+        self.assertEqual(
+            renderer.render_markup('[footer]'),
+            '<footer>a<a>/a</a></footer>'
+        )
+        with self.subTest('unread globals'):
+            renderer.set_globals({'site': 'a', 'home': '/a', 'unused': 'y'})
+            renderer.render_markup('[footer]')
+            self.assertEqual(len(renderer.cache_store), 1)
+        with self.subTest('changed globals'):
+            renderer.set_globals({'site': 'b', 'home': '/a'})
+            self.assertEqual(
+                renderer.render_markup('[footer]'),
+                '<footer>b<a>/a</a></footer>'
+            )
+            renderer.set_globals({'site': 'b', 'home': '/b'})
+            self.assertEqual(
+                renderer.render_markup('[footer]'),
+                '<footer>b<a>/b</a></footer>'
+            )
+        with self.subTest('changed tags'):
+            renderer['footer'] = '<footer>[link]</footer>'
+            self.assertEqual(
+                renderer.render_markup('[footer]'),
+                '<footer><a>/b</a></footer>'
+            )
+            renderer['link'] = '<b>[\\\\home]</b>'
+            self.assertEqual(
+                renderer.render_markup('[footer]'),
+                '<footer><b>/b</b></footer>'
+            )
+
+    def test_uncached(self):
+        for _ in range(2):
+            self.renderer.render_markup('[nav a\\page\\\\b]')
+        self.assertEqual(self.renderer.get_tag.call_count, 2)
+        self.assertEqual(len(self.renderer.cache_store), 0)
+
+    def test_custom_store(self):
+        store = MagicMock()
+        store.get.side_effect = KeyError
+        renderer = self.TestRenderer(
+            {'footer': 'f'},
+            cache_store=store
+        )
+        self.assertEqual(renderer.render_markup('[footer]'), 'f')
+        store.set.assert_called_once_with(
+            ('footer', frozenset(), (), (('footer', 'f'),), frozenset()),
+            'f',
+            60
+        )
+
+
+class ShadowMixinTestCase(TestCase):
+    class TestRenderer(ShadowMixin, CacheMixin, TagDictMixin, BaseRenderer):
+        shadow_rate = 1.0
+
+    def setUp(self):
+        self.renderer = self.TestRenderer({
+            'bold': '<b>[\\\\1]</b>',
+            'nav': '<nav>[bold [\\\\1]]</nav>',
+        })
+
+    def test_match(self):
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[nav a][\\\\1]',
+                pos_args=iter('x')
+            ),
+            '<nav><b>a</b></nav>x'
+        )
+        stats = self.renderer.shadow_stats
+        self.assertEqual(stats.samples, 1)
+        self.assertEqual(stats.mismatches, [])
+        self.assertGreater(stats.reference_time, 0.0)
+        self.assertEqual(
+            stats.latency_delta,
+            stats.time - stats.reference_time
+        )
+
+    def test_mismatch(self):
+        markup = '[nav cache-key\\\\nav\\a]'
+        self.renderer.render_markup(markup)
+        self.renderer['bold'] = '<strong>[\\\\1]</strong>'
+        self.assertEqual(
+            self.renderer.render_markup(markup),
+            '<nav><b>a</b></nav>'
+        )
+        mismatches = self.renderer.shadow_stats.mismatches
+        self.assertEqual(len(mismatches), 1)
+        self.assertEqual(mismatches[0].markup, markup)
+        self.assertEqual(
+            mismatches[0].result,
+            ('result', '<nav><b>a</b></nav>')
+        )
+        self.assertEqual(
+            mismatches[0].reference,
+            ('result', '<nav><strong>a</strong></nav>')
+        )
+
+    def test_errors(self):
+        with self.assertRaises(TagNotFound):
+            self.renderer.render_markup('[bad-tag]')
+        self.assertEqual(self.renderer.shadow_stats.samples, 1)
+        self.assertEqual(self.renderer.shadow_stats.mismatches, [])
+
+    def test_reference_bypasses_caches(self):
+        store = ParseStore()
+        renderer = self.TestRenderer(
+            {'bold': '<b>[\\\\1]</b>'},
+            parse_store=store
+        )
+        renderer.shadow_render(
+            '[bold a][bold a]',
+            {},
+            [],
+            ('result', '<b>a</b><b>a</b>'),
+            0.0
+        )
+        self.assertEqual(renderer.shadow_stats.mismatches, [])
+        self.assertEqual(len(store), 0)
+        self.assertEqual(renderer.tag_asts, {})
+        self.assertEqual(renderer.tag_memo, {})
+
+    def test_sampling(self):
+        renderer = self.TestRenderer({'bold': 'b'}, shadow_rate=0.5)
+        with patch('tagup.language.random', side_effect=[0.7, 0.3]):
+            renderer.render_markup('[bold]')
+            renderer.render_markup('[bold]')
+        self.assertEqual(renderer.shadow_stats.samples, 1)
+
+
+class AutoescapeMixinTestCase(TestCase):
+    class TestRenderer(AutoescapeMixin, BaseRenderer):
+        tags = {
+            'bold': '<b>[\\\\1]</b>',
+            'link': '<a href="[\\\\href]">[bold [\\\\1]]</a>',
+            'list': '<ul>[\\loop <li>[\\item]</li>]</ul>',
+        }
+
+        def get_tag(self, name):
+            return self.tags[name]
+
+    def setUp(self):
+        self.renderer = self.TestRenderer()
+
+    def test_named_substitution(self):
+        self.assertEqual(
+            self.renderer.render_markup(
+                '<p>[\\\\name]</p>',
+                named_args={'name': '<script>"x"</script>'}
+            ),
+            '<p>&lt;script&gt;&quot;x&quot;&lt;/script&gt;</p>'
+        )
+
+    def test_positional_substitution(self):
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[bold [\\\\1]]',
+                pos_args=['a & b']
+            ),
+            '<b>a &amp; b</b>'
+        )
+
+    def test_no_double_escaping(self):
+        with self.subTest('nested tags'):
+            self.assertEqual(
+                self.renderer.render_markup(
+                    '[link href\\\\[\\\\url]\\[\\\\text]]',
+                    named_args={'url': '/?a=1&b=2', 'text': '<3'}
+                ),
+                '<a href="/?a=1&amp;b=2"><b>&lt;3</b></a>'
+            )
+        with self.subTest('safe string'):
+            self.assertEqual(
+                self.renderer.render_markup(
+                    '[\\\\html]',
+                    named_args={'html': SafeString('<i>safe</i>')}
+                ),
+                '<i>safe</i>'
+            )
+        with self.subTest('rendered output'):
+            html = self.renderer.render_markup('[bold <i>]')
+            self.assertIsInstance(html, SafeString)
+            self.assertEqual(
+                self.renderer.render_markup(
+                    '[\\\\html]',
+                    named_args={'html': html}
+                ),
+                '<b><i></b>'
+            )
+
+    def test_loop_items(self):
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[list [\\\\1]\\<2>]',
+                pos_args=['<1>']
+            ),
+            '<ul><li>&lt;1&gt;</li><li><2></li></ul>'
+        )
+        self.assertEqual(
+            self.renderer.render_markup(
+                '[\\loop [\\item]]',
+                pos_args=['<1>', '<2>']
+            ),
+            '&lt;1&gt;&lt;2&gt;'
+        )
+
+    def test_disabled_by_default(self):
+        renderer = RenderingTestCase.TestRenderer()
+        self.assertEqual(
+            renderer.render_markup(
+                '[\\\\name]',
+                named_args={'name': '<b>'}
+            ),
+            '<b>'
+        )
+
+
+class WarmTestCase(TestCase):
+    class TestRenderer(TagDictMixin, BaseRenderer):
+        pass
+
+    tags = {
+        'bold': '<b>[\\\\1]</b>',
+        'title': '<h1>[bold [\\\\1]]</h1>',
+    }
+
+    def setUp(self):
+        self.renderer = self.TestRenderer(self.tags)
+
+    def test_warm(self):
+        self.addCleanup(gc.unfreeze)
+        self.renderer.warm()
+        self.assertEqual(
+            set(self.renderer.tag_asts),
+            set(self.tags.values())
+        )
+        self.assertGreater(gc.get_freeze_count(), 0)
+        ast = self.renderer.parse_markup('[title Home]')
+        self.renderer.parse_markup = MagicMock(
+            side_effect=AssertionError('tag was parsed after warm()')
+        )
+        with self.subTest('repeated render'):
+            for _ in range(2):
+                self.assertEqual(
+                    self.renderer.evaluate_ast(ast, {}, []),
+                    '<h1><b>Home</b></h1>'
+                )
+
+    def test_warm_subset(self):
+        self.renderer.warm(['bold'], freeze=False)
+        self.assertEqual(
+            list(self.renderer.tag_asts),
+            [self.tags['bold']]
+        )
+
+    def test_shared_memory(self):
+        self.renderer.warm(freeze=False)
+        shm = self.renderer.export_tag_asts()
+        self.addCleanup(shm.unlink)
+        self.addCleanup(shm.close)
+        other = self.TestRenderer(self.tags)
+        other.import_tag_asts(shm.name)
+        self.assertEqual(other.tag_asts, self.renderer.tag_asts)
+        self.assertEqual(
+            other.render_markup('[title Home]'),
+            '<h1><b>Home</b></h1>'
+        )
+
+    def test_bounded(self):
+        names = 'abcdefghij'
+        renderer = self.TestRenderer(
+            {name: name.upper() for name in names},
+            max_tag_asts=3
+        )
+        for name in names:
+            self.assertEqual(renderer.render_markup(f'[{name}]'), name.upper())
+        self.assertEqual(list(renderer.tag_asts), ['H', 'I', 'J'])
+
+    def test_warm_beyond_bound(self):
+        names = 'abcdefghij'
+        renderer = self.TestRenderer(
+            {name: name.upper() for name in names},
+            max_tag_asts=3
+        )
+        renderer.warm(freeze=False)
+        self.assertEqual(len(renderer.tag_asts), len(names))
+        renderer.render_markup('[\\if x\\[a][b][c][d]]')
+        renderer.parse_shared_markup = MagicMock(
+            side_effect=AssertionError('tag was parsed after warm()')
+        )
+        for name in names:
+            self.assertEqual(renderer.render_markup(f'[{name}]'), name.upper())
+
+    def test_shared_memory_outlives_importer(self):
+        self.renderer.warm(freeze=False)
+        shm = self.renderer.export_tag_asts()
+        self.addCleanup(shm.unlink)
+        self.addCleanup(shm.close)
+        script = (
+            'import sys\n'
+            'from tagup import BaseRenderer, TagDictMixin\n'
+            'class Renderer(TagDictMixin, BaseRenderer):\n'
+            '    pass\n'
+            'Renderer().import_tag_asts(sys.argv[1])\n'
+        )
+        # Output is captured so that the run also waits for the resource
+        # tracker the script may have started, which shares its stderr.
+        result = subprocess.run(
+            [sys.executable, '-c', script, shm.name],
+            capture_output=True,
+            check=True,
+            cwd=path.dirname(path.dirname(path.abspath(__file__)))
+        )
+        self.assertEqual(result.stderr, b'')
+        other = self.TestRenderer(self.tags)
+        other.import_tag_asts(shm.name)
+        self.assertEqual(other.tag_asts, self.renderer.tag_asts)
+
+    def test_get_tag_names_not_implemented(self):
+        renderer = TagFetchTestCase.UnimplementedFetchTestRenderer()
+        with self.assertRaises(ImproperlyConfigured):
+            renderer.warm()
+
+
 class BadSyntaxTestCase(TestCase):
     class TestRenderer(BaseRenderer):
         tags = {
@@ -690,3 +1739,76 @@ class ArgumentsMissingTestCase(TestCase):
             'pos-arg-missing -> '
             '1'
         )
+
+
+class MissingPolicyTestCase(TestCase):
+    class TestRenderer(StaticTagMixin, BaseRenderer):
+        tags = {
+            'named-arg-missing': '<[\\\\bad-arg]>',
+            'pos-arg-missing': '<[\\\\1]>',
+            'tag-missing': '<[bad-tag]>',
+        }
+
+    markup = '[named-arg-missing][pos-arg-missing][tag-missing]'
+
+    def get_renderer(self, tag_policy, argument_policy):
+        return type('PolicyTestRenderer', (self.TestRenderer,), {
+            'missing_tag_policy': tag_policy,
+            'missing_argument_policy': argument_policy,
+        })()
+
+    def test_empty(self):
+        renderer = self.get_renderer('empty', 'empty')
+        renderer.tag_stack.stack_trace = MagicMock(
+            side_effect=AssertionError('trace was built')
+        )
+        self.assertEqual(renderer.render_markup(self.markup), '<><><>')
+        self.assertEqual(renderer.missing_references, [])
+
+    def test_placeholder(self):
+        renderer = self.get_renderer('placeholder', 'placeholder')
+        self.assertEqual(
+            renderer.render_markup(self.markup),
+            '<[\\\\bad-arg]><[\\\\1]><[bad-tag]>'
+        )
+
+    def test_warn(self):
+        renderer = self.get_renderer('warn', 'warn')
+        self.assertEqual(renderer.render_markup(self.markup), '<><><>')
+        self.assertEqual(
+            [str(missing) for missing in renderer.missing_references],
+            [
+                'ROOT -> named-arg-missing:1,5: missing named argument '
+                'bad-arg',
+                'ROOT -> pos-arg-missing:1,5: missing positional argument 1',
+                'ROOT -> tag-missing:1,3: missing tag bad-tag',
+            ]
+        )
+        with self.subTest('reset per render'):
+            renderer.render_markup('valid')
+            self.assertEqual(renderer.missing_references, [])
+        with self.subTest('duplicate calls'):
+            renderer.render_markup('[pos-arg-missing] [pos-arg-missing]')
+            self.assertEqual(len(renderer.missing_references), 2)
+
+    def test_independent(self):
+        renderer = self.get_renderer('placeholder', 'raise')
+        self.assertEqual(
+            renderer.render_markup('[tag-missing]'),
+            '<[bad-tag]>'
+        )
+        with self.assertRaises(NamedArgumentMissing):
+            renderer.render_markup('[named-arg-missing]')
+
+    def test_invalid(self):
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            self.get_renderer('ignore', 'raise')
+        self.assertEqual(
+            str(cm.exception),
+            "invalid missing reference policy 'ignore'"
+        )
+
+    def test_has_tag(self):
+        renderer = self.TestRenderer()
+        self.assertTrue(renderer.has_tag('tag-missing'))
+        self.assertFalse(renderer.has_tag('bad-tag'))
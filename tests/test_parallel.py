@@ -0,0 +1,97 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from unittest import TestCase
+
+from tagup import (
+    BaseRenderer,
+    StaticTagMixin,
+    TrimMixin,
+    create_render_pool,
+)
+from tagup.exceptions import NamedArgumentMissing
+
+
+class LibraryRenderer(StaticTagMixin, BaseRenderer):
+    tags = {
+        'bold': '<b>[\\\\1]</b>',
+        'section': '<h2>[bold [\\\\1]]</h2>[\\\\site]',
+        'broken': '<p>[\\\\bad-arg]</p>',
+        'items': '[\\loop <li>[\\item]</li>]',
+    }
+
+
+class TrimLibraryRenderer(TrimMixin, LibraryRenderer):
+    pass
+
+
+class WarnLibraryRenderer(LibraryRenderer):
+    missing_argument_policy = 'warn'
+
+
+class RenderParallelTestCase(TestCase):
+    markup = (
+        '  [section One]\n'
+        '[\\if title\\<h1>[\\\\title]</h1>]\n'
+        '[\\loop [bold [\\item]]]\n'
+        + ''.join(f'[section {i}] text {i}\n' for i in range(20))
+        + '[items x\\y]  '
+    )
+
+    def render(self, renderer_class, markup, named_args=dict(), pos_args=()):
+        renderer = renderer_class()
+        renderer.set_globals({'site': 'S'})
+        serial = renderer.render_markup(markup, named_args, iter(pos_args))
+        with create_render_pool(renderer_class, jobs=2) as executor:
+            parallel = renderer.render_parallel(
+                markup,
+                executor,
+                named_args,
+                iter(pos_args),
+                chunks=5
+            )
+
+        return serial, parallel, renderer
+
+    def test_same_output(self):
+        for renderer_class in (LibraryRenderer, TrimLibraryRenderer):
+            with self.subTest(renderer_class=renderer_class.__name__):
+                serial, parallel, _ = self.render(
+                    renderer_class,
+                    self.markup,
+                    named_args={'title': 'T'},
+                    pos_args=['a', 'b']
+                )
+                self.assertEqual(parallel, serial)
+
+    def test_error_trace(self):
+        renderer = LibraryRenderer()
+        renderer.set_globals({'site': 'S'})
+        markup = self.markup + '\n[broken]'
+        with self.assertRaises(NamedArgumentMissing) as serial:
+            renderer.render_markup(markup)
+        with create_render_pool(LibraryRenderer, jobs=2) as executor:
+            with self.assertRaises(NamedArgumentMissing) as parallel:
+                renderer.render_parallel(markup, executor, chunks=5)
+        self.assertEqual(str(parallel.exception), str(serial.exception))
+        self.assertEqual(
+            str(parallel.exception.tag_stack_trace),
+            'ROOT:25,2 -> broken -> bad-arg'
+        )
+
+    def test_missing_references(self):
+        _, result, renderer = self.render(
+            WarnLibraryRenderer,
+            '[broken] [bold a] [broken]'
+        )
+        self.assertEqual(result, '<p></p> <b>a</b> <p></p>')
+        self.assertEqual(
+            [str(missing) for missing in renderer.missing_references],
+            [
+                'ROOT -> broken:1,7: missing named argument bad-arg',
+                'ROOT -> broken:1,7: missing named argument bad-arg',
+            ]
+        )
@@ -0,0 +1,68 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from io import StringIO
+from itertools import count
+from unittest import TestCase
+from unittest.mock import patch
+
+from tagup import BaseRenderer
+from tagup.profiling import StackSampler
+
+
+class StackSamplerTestCase(TestCase):
+    class TestRenderer(BaseRenderer):
+        tags = {
+            'cell': 'c',
+            'row': '[cell]',
+            'table': '[row]',
+        }
+
+        def get_tag(self, name):
+            return self.tags[name]
+
+    def test_collapsed_stacks(self):
+        sampler = StackSampler()
+        renderer = self.TestRenderer(sampler=sampler)
+        clock = count()
+        with patch('tagup.profiling.perf_counter', lambda: next(clock)):
+            self.assertEqual(renderer.render_markup('[table]'), 'c')
+        f_out = StringIO()
+        sampler.write_collapsed(f_out)
+        self.assertEqual(
+            f_out.getvalue(),
+            'ROOT 2000000\n'
+            'ROOT;table 2000000\n'
+            'ROOT;table;row 2000000\n'
+            'ROOT;table;row;cell 1000000\n'
+        )
+
+    def test_accumulates_across_renders(self):
+        sampler = StackSampler()
+        renderer = self.TestRenderer(sampler=sampler)
+        clock = count()
+        with patch('tagup.profiling.perf_counter', lambda: next(clock)):
+            renderer.render_markup('[cell]')
+            renderer.render_markup('[cell]')
+        self.assertEqual(
+            list(sampler.collapsed()),
+            ['ROOT 4000000', 'ROOT;cell 2000000']
+        )
+        sampler.clear()
+        self.assertEqual(list(sampler.collapsed()), [])
+
+    def test_sample_rate(self):
+        sampler = StackSampler(rate=0.25)
+        renderer = self.TestRenderer(sampler=sampler)
+        with patch('tagup.profiling.random', side_effect=[0.5, 0.1]):
+            renderer.render_markup('[table]')
+            self.assertEqual(sampler.samples, {})
+            renderer.render_markup('[table]')
+        self.assertEqual(
+            set(sampler.samples),
+            {(), ('table',), ('table', 'row'), ('table', 'row', 'cell')}
+        )
+        self.assertFalse(sampler.active)
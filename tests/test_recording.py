@@ -0,0 +1,152 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+import json
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from tagup import BaseRenderer, TagDictMixin
+from tagup.exceptions import TagNotFound, TagupSyntaxError
+from tagup.recording import (
+    RenderRecorder,
+    percentile,
+    read_recording,
+    replay,
+)
+
+
+class RecordingTestCase(TestCase):
+    class TestRenderer(TagDictMixin, BaseRenderer):
+        pass
+
+    tags = {
+        'bold': '<b>[\\\\1]</b>',
+        'footer': '<footer>[\\\\site]</footer>',
+        'page': '[bold [\\\\title]][footer]',
+    }
+    markup = '[page\\title\\\\[\\\\title]]'
+
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filepath = path.join(tmp_dir.name, 'renders.jsonl')
+
+    def get_renderer(self, **kwargs):
+        recorder = RenderRecorder(self.filepath, **kwargs)
+        self.addCleanup(recorder.close)
+        renderer = self.TestRenderer(self.tags, recorder=recorder)
+        renderer.set_globals({'site': 'example', 'unused': 'x'})
+
+        return renderer
+
+    def read_entries(self):
+        with open(self.filepath) as f_in:
+            return [json.loads(line) for line in f_in]
+
+    def test_record(self):
+        renderer = self.get_renderer()
+        for title in ('One', 'Two'):
+            self.assertEqual(
+                renderer.render_markup(self.markup, {'title': title}),
+                f'<b>{title}</b><footer>example</footer>'
+            )
+        renderer.render_markup('[\\loop [\\item]]', {}, iter('ab'))
+        with self.assertRaises(TagNotFound):
+            renderer.render_markup('[missing]')
+
+        first, second, loop, error = self.read_entries()
+        self.assertEqual(first['markup'], self.markup)
+        self.assertEqual(first['n'], {'title': 'One'})
+        # Only globals the markup can read are recorded.
+        self.assertEqual(first['globals'], {'site': 'example'})
+        self.assertEqual(set(first['t']), {'bold', 'footer', 'page'})
+        self.assertNotIn('output', first)
+        # Markup and globals are only written the first time.
+        self.assertNotIn('markup', second)
+        self.assertNotIn('globals', second)
+        self.assertEqual(second['m'], first['m'])
+        self.assertNotEqual(second['o'], first['o'])
+        self.assertEqual(loop['p'], ['a', 'b'])
+        self.assertEqual(error['e'], 'TagNotFound: ROOT:1,2 -> missing')
+        self.assertNotIn('o', error)
+
+    def test_options(self):
+        renderer = self.get_renderer(store_markup=False, store_output=True)
+        renderer.render_markup('[bold x]')
+        entry, = self.read_entries()
+        self.assertNotIn('markup', entry)
+        self.assertEqual(entry['output'], '<b>x</b>')
+        records, skipped = read_recording(self.filepath)
+        self.assertEqual((records, skipped), ([], 1))
+
+    def test_providers(self):
+        calls = []
+
+        def provider(value):
+            def provide():
+                calls.append(value)
+                return value
+            return provide
+
+        renderer = self.get_renderer()
+        renderer.set_globals({'site': provider('lazy')})
+        renderer.render_markup(
+            '[\\\\a] [footer]',
+            {'a': provider('b'), 'unused': provider('x'), 'plain': 'y'}
+        )
+        entry, = self.read_entries()
+        # Providers are called once by the render and never by the
+        # recorder, and unread arguments are left out.
+        self.assertEqual(sorted(calls), ['b', 'lazy'])
+        self.assertEqual(entry['n'], {'a': 'b'})
+        self.assertEqual(entry['globals'], {'site': 'lazy'})
+
+    def test_syntax_error(self):
+        renderer = self.get_renderer()
+        with self.assertRaises(TagupSyntaxError):
+            renderer.render_markup('[bold', {'a': 'b'})
+        entry, = self.read_entries()
+        self.assertEqual(entry['e'], 'TagupSyntaxError: ROOT:1,2 -> END')
+        self.assertEqual(entry['t'], {})
+        self.assertEqual(entry['n'], {'a': 'b'})
+        records, _ = read_recording(self.filepath)
+        report = replay(self.TestRenderer(self.tags), records)
+        self.assertEqual(report.differences, [])
+
+    def test_replay(self):
+        renderer = self.get_renderer(store_output=True)
+        renderer.render_markup(self.markup, {'title': 'One'})
+        renderer.render_markup('[bold [\\\\1]]', {}, ['x'])
+        with self.assertRaises(TagNotFound):
+            renderer.render_markup('[missing]')
+        records, skipped = read_recording(self.filepath)
+        self.assertEqual((len(records), skipped), (3, 0))
+
+        with self.subTest('unchanged'):
+            report = replay(self.TestRenderer(self.tags), records, repeat=2)
+            self.assertEqual(report.count, 6)
+            self.assertEqual(report.differences, [])
+            self.assertEqual(report.stale, 0)
+            self.assertEqual(report.as_dict()['renders'], 6)
+            self.assertIn('replayed 6 renders (0 skipped)', str(report))
+        with self.subTest('changed'):
+            tags = {**self.tags, 'bold': '<strong>[\\\\1]</strong>'}
+            report = replay(self.TestRenderer(tags), records)
+            self.assertEqual(report.stale, 2)
+            self.assertEqual(
+                [difference.index for difference in report.differences],
+                [0, 1]
+            )
+            self.assertIn('+<strong>x</strong>', str(report))
+            self.assertIn('-<b>x</b>', str(report))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([3], 0.9), 3)
+        self.assertEqual(percentile([], 0.5), 0.0)
@@ -0,0 +1,125 @@
+"""
+This file is part of the tagup Python module which is released under MIT.
+See file LICENSE for full license details.
+"""
+
+
+from unittest import TestCase
+
+from tagup import BaseRenderer, TagDictMixin
+from tagup.validation import check_markup
+
+
+class CheckMarkupTestCase(TestCase):
+    def setUp(self):
+        self.parser = BaseRenderer().get_parser()
+
+    def test_valid(self):
+        errors, calls = check_markup(self.parser, 'a [b x]\n[c-d]')
+        self.assertEqual(errors, [])
+        self.assertEqual(calls, [('b', 1, 4), ('c-d', 2, 2)])
+
+    def test_recovery(self):
+        errors, calls = check_markup(
+            self.parser,
+            'a]\n[\\\\x\\\\y] [A] [link]'
+        )
+        self.assertEqual(
+            errors,
+            [(1, 2, ']'), (2, 5, '\\'), (2, 11, 'A')]
+        )
+        # Recovery deletes "[A] " whole, so the call right after it is
+        # not trusted.
+        self.assertEqual(calls, [])
+
+    def test_recovered_calls(self):
+        for markup, expected in (
+            ('[ok] ]x [b]', [('ok', 1, 2), ('b', 1, 10)]),
+            ('[[bad]]', []),
+            ('[a [\\bad]] [ok]', [('ok', 1, 13)]),
+            ('[x\\\\ [y]] [ok]', [('ok', 1, 12)]),
+        ):
+            with self.subTest(markup=markup):
+                errors, calls = check_markup(self.parser, markup)
+                self.assertTrue(errors)
+                self.assertEqual(calls, expected)
+
+    def test_end(self):
+        with self.subTest('first error'):
+            self.assertEqual(
+                check_markup(self.parser, '[a'),
+                ([(1, 2, 'END')], None)
+            )
+        with self.subTest('after recovery'):
+            self.assertEqual(
+                check_markup(self.parser, '[a]]['),
+                ([(1, 4, ']')], None)
+            )
+
+
+class ValidateTagsTestCase(TestCase):
+    class TestRenderer(TagDictMixin, BaseRenderer):
+        pass
+
+    tags = {
+        'page': '<main>[header]\n[footer][menu]</main>',
+        'header': '<h1>[\\\\title]]</h1>',
+        'footer': '<footer>[nav]</footer>',
+        'nav': '[\\if 1\\[footer [\\\\1]]]',
+        'self': '[self]',
+        'open': '[page',
+    }
+
+    def setUp(self):
+        self.renderer = self.TestRenderer(self.tags)
+
+    def test_report(self):
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                report = self.renderer.validate_tags(jobs=jobs)
+                self.assertFalse(report.ok)
+                self.assertEqual(report.as_dict(), {
+                    'tags': 6,
+                    'problems': [
+                        {
+                            'kind': 'cycle',
+                            'tag': 'footer',
+                            'line': 1,
+                            'column': 10,
+                            'message': 'dependency cycle '
+                            'footer -> nav -> footer',
+                        },
+                        {
+                            'kind': 'syntax',
+                            'tag': 'header',
+                            'line': 1,
+                            'column': 14,
+                            'message': 'unexpected ]',
+                        },
+                        {
+                            'kind': 'syntax',
+                            'tag': 'open',
+                            'line': 1,
+                            'column': 2,
+                            'message': 'unexpected END',
+                        },
+                        {
+                            'kind': 'missing_tag',
+                            'tag': 'page',
+                            'line': 2,
+                            'column': 10,
+                            'message': 'tag menu not found',
+                        },
+                        {
+                            'kind': 'cycle',
+                            'tag': 'self',
+                            'line': 1,
+                            'column': 2,
+                            'message': 'dependency cycle self -> self',
+                        },
+                    ]
+                })
+
+    def test_valid(self):
+        renderer = self.TestRenderer({'a': '[b]', 'b': 'x'})
+        self.assertTrue(renderer.validate_tags().ok)